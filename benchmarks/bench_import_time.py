@@ -0,0 +1,115 @@
+"""
+启动导入耗时预算
+
+以 `python -X importtime -c "import main"` 测量 main.py 的导入耗时（不含解释器自身的 site 初始化），
+重复若干次取中位数，超出预算或导入了不应在启动时加载的模块时以非零退出码结束，可直接用于 CI：
+- 下载器客户端库（qbittorrentapi、transmission_rpc）在首次连接对应类型的下载器时才导入
+- 通知依赖（requests、smtplib、email.mime）在实际发送时才导入
+- http.server 在启用指标服务时才导入
+- 实时监控（ctypes/inotify）、全局模式扫描与性能剖析（cProfile）在对应功能启用时才导入
+
+测量前先编译字节码：镜像中设置了 PYTHONDONTWRITEBYTECODE=1，构建时已预编译，
+这里测的是与容器一致的“有 .pyc”的冷启动
+
+运行方式（仓库根目录）:
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --budget-ms 120 --repeat 7 --top 15
+"""
+
+import argparse
+import compileall
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BUDGET_MS = 150
+
+# 启动时不应导入的模块（及其子模块）
+DEFERRED_MODULES = (
+    "qbittorrentapi", "transmission_rpc", "requests", "urllib3", "smtplib", "email.mime",
+    "http.server", "concurrent.futures.process", "pstats", "cProfile", "ctypes",
+    "module.watcher", "module.global_scanner", "module.profiling",
+)
+
+
+def _parse(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """解析 -X importtime 输出：模块名 -> (自身耗时 us, 累计耗时 us)，同名取第一次"""
+    timings: Dict[str, Tuple[int, int]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        timings.setdefault(name.strip(), (int(self_us), int(cumulative_us)))
+    return timings
+
+
+def measure_once() -> Dict[str, Tuple[int, int]]:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            LOG_PATH=os.path.join(tmp, "Void.log"),
+            CONFIG_PATH=os.path.join(tmp, "config.yaml"),
+            PYTHONDONTWRITEBYTECODE="1",
+        )
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+        )
+    return _parse(result.stderr)
+
+
+def _deferred_violations(timings: Dict[str, Tuple[int, int]]) -> List[str]:
+    """启动时已被导入的 DEFERRED_MODULES 条目"""
+    return [
+        module for module in DEFERRED_MODULES
+        if any(name == module or name.startswith(module + ".") for name in timings)
+    ]
+
+
+def run(budget_ms: float, repeat: int, top: int) -> int:
+    compileall.compile_file(os.path.join(ROOT, "main.py"), quiet=1)
+    for package in ("module", "tools"):
+        compileall.compile_dir(os.path.join(ROOT, package), quiet=1)
+
+    runs = [measure_once() for _ in range(repeat)]
+    totals = [timings["main"][1] / 1000 for timings in runs]
+    median_ms = statistics.median(totals)
+
+    # 自身耗时最高的模块（取中位数那一次）
+    typical = runs[totals.index(sorted(totals)[len(totals) // 2])]
+    print(f"{'模块':<40} {'自身(ms)':>10} {'累计(ms)':>10}")
+    for name, (self_us, cumulative_us) in sorted(typical.items(), key=lambda kv: kv[1][0], reverse=True)[:top]:
+        print(f"{name:<40} {self_us / 1000:>10.1f} {cumulative_us / 1000:>10.1f}")
+
+    print(f"\nimport main: 中位数 {median_ms:.1f} ms（{repeat} 次: {', '.join(f'{t:.0f}' for t in totals)}），"
+          f"预算 {budget_ms:.0f} ms")
+
+    status = 0
+    violations = _deferred_violations(typical)
+    if violations:
+        print(f"[失败] 启动时导入了应延迟加载的模块: {', '.join(violations)}")
+        status = 1
+    if median_ms > budget_ms:
+        print(f"[失败] 导入耗时超出预算 {median_ms - budget_ms:.1f} ms")
+        status = 1
+    if status == 0:
+        print("[通过]")
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动导入耗时预算")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="列出自身耗时最高的模块数")
+    args = parser.parse_args()
+    sys.exit(run(args.budget_ms, args.repeat, args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+做种清单内存基准
+
+对比扫描前构建做种索引的两种方式：
+- 旧实现：规范化后的路径列表 + 前缀树 SeededPathIndex
+- 新实现：一次构建的 CompactPathIndex（有序字节串数组）
+
+两者都从同一份下载器返回的内容路径集合出发（该集合本身不计入），
+每种实现在独立的子进程中构建，分别报告 tracemalloc 统计的索引占用与进程峰值 RSS 增量，
+并核对两者对同一批查询给出相同结论。
+
+运行方式（仓库根目录）:
+    python -m benchmarks.bench_inventory_memory
+    python -m benchmarks.bench_inventory_memory --sizes 100000 1000000 --files-per-torrent 10
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+from benchmarks.bench_seeded_index import generate_lookups, generate_seeded_paths
+from module.seeded_index import CompactPathIndex, SeededPathIndex
+from module.unseeded import normalize_path
+
+
+def _peak_rss_kb() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def generate_content_paths(torrents: int, files_per_torrent: int) -> set:
+    """模拟精确模式下的内容路径：每个种子目录下若干文件；files_per_torrent 为 0 时只有种子目录本身"""
+    paths = set()
+    for base in generate_seeded_paths(torrents):
+        if files_per_torrent:
+            paths.update(os.path.join(base, "S01", f"E{j:03d}.mkv") for j in range(files_per_torrent))
+        else:
+            paths.add(base)
+    return paths
+
+
+def _build(variant: str, content_paths: set):
+    if variant == "trie":
+        seed_paths = [normalize_path(p) for p in content_paths]
+        return seed_paths, SeededPathIndex(seed_paths)
+    return None, CompactPathIndex(content_paths, normalize_path)
+
+
+def _measure(variant: str, torrents: int, files_per_torrent: int, lookups: list, results) -> None:
+    """子进程内执行：清单先于索引生成，只统计构建索引新增的内存"""
+    content_paths = generate_content_paths(torrents, files_per_torrent)
+    rss_before = _peak_rss_kb()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    built = _build(variant, content_paths)
+    build_seconds = time.perf_counter() - start
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    rss_after = _peak_rss_kb()
+
+    index = built[1]
+    start = time.perf_counter()
+    answers = [index.contains(path) for path in lookups]
+    lookup_us = (time.perf_counter() - start) / len(lookups) * 1e6
+
+    results.put({
+        "paths": len(content_paths),
+        "index_mb": index_bytes / (1024 * 1024),
+        "rss_delta_mb": (rss_after - rss_before) / 1024,
+        "build_seconds": build_seconds,
+        "lookup_us": lookup_us,
+        "answers": answers,
+    })
+
+
+def run(sizes: list, files_per_torrent: int, lookups_count: int) -> None:
+    context = multiprocessing.get_context("fork")
+    print(
+        f"{'种子数':>10} {'内容路径':>10} {'实现':>8} {'索引(MB)':>10} {'峰值RSS增量(MB)':>16} "
+        f"{'构建(s)':>8} {'查询(us/次)':>12}"
+    )
+    for size in sizes:
+        lookups = generate_lookups(generate_seeded_paths(size), lookups_count)
+        measured = {}
+        for variant in ("trie", "compact"):
+            results = context.Queue()
+            process = context.Process(target=_measure, args=(variant, size, files_per_torrent, lookups, results))
+            process.start()
+            measured[variant] = results.get()
+            process.join()
+            m = measured[variant]
+            print(
+                f"{size:>10} {m['paths']:>10} {variant:>8} {m['index_mb']:>10.1f} {m['rss_delta_mb']:>16.1f} "
+                f"{m['build_seconds']:>8.2f} {m['lookup_us']:>12.2f}"
+            )
+
+        # 两种实现的结论必须一致
+        assert measured["trie"]["answers"] == measured["compact"]["answers"]
+        ratio = measured["trie"]["index_mb"] / max(measured["compact"]["index_mb"], 1e-9)
+        print(f"{'':>10} 紧凑索引内存为前缀树的 1/{ratio:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="做种清单内存基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--files-per-torrent", type=int, default=0,
+                        help="每个种子的文件数（模拟精确模式），0 表示只有种子目录")
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+    run(args.sizes, args.files_per_torrent, args.lookups)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+做种路径索引微基准
+
+对比旧实现（逐个做种路径 startswith 线性比对）、前缀树索引 SeededPathIndex
+与紧凑索引 CompactPathIndex（扫描实际使用）的构建耗时、单次查找耗时与索引内存（tracemalloc）
+
+运行方式（仓库根目录）:
+    python -m benchmarks.bench_seeded_index
+    python -m benchmarks.bench_seeded_index --sizes 10000 100000
+"""
+
+import argparse
+import os
+import random
+import time
+import tracemalloc
+
+from module.seeded_index import CompactPathIndex, SeededPathIndex
+
+
+def generate_seeded_paths(count: int, seed: int = 42) -> list:
+    """生成类似 PT 下载目录结构的做种内容路径"""
+    rng = random.Random(seed)
+    categories = ["movies", "tv", "music", "anime", "docs", "games"]
+    paths = []
+    for i in range(count):
+        category = categories[i % len(categories)]
+        group = f"group{rng.randrange(200):03d}"
+        paths.append(os.sep + os.path.join("data", category, group, f"Torrent.Name.{i:07d}.2160p.WEB-DL"))
+    return paths
+
+
+def generate_lookups(seeded_paths: list, count: int, seed: int = 7) -> list:
+    """生成待查询文件：一半位于做种目录内，一半为孤立文件"""
+    rng = random.Random(seed)
+    lookups = []
+    for i in range(count):
+        base = rng.choice(seeded_paths)
+        if i % 2:
+            lookups.append(os.path.join(base, "S01", f"E{i:04d}.mkv"))
+        else:
+            lookups.append(base + f".orphan{i}" + os.sep + "file.mkv")
+    return lookups
+
+
+def linear_contains(seeded_paths: list, path: str) -> bool:
+    for seeded in seeded_paths:
+        if path == seeded or path.startswith(seeded + os.sep):
+            return True
+    return False
+
+
+def time_per_lookup(func, lookups: list) -> float:
+    start = time.perf_counter()
+    for path in lookups:
+        func(path)
+    return (time.perf_counter() - start) / len(lookups)
+
+
+def build(factory, seeded: list):
+    """构建索引，返回 (索引, 构建耗时, 索引占用字节)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = factory(seeded)
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return index, elapsed, size
+
+
+def run(sizes: list, lookups_count: int, linear_budget: int) -> None:
+    print(
+        f"{'做种路径数':>12} {'实现':>8} {'构建(s)':>10} {'索引(MB)':>10} {'查询(us/次)':>12} {'相对线性':>10}"
+    )
+    for size in sizes:
+        seeded = generate_seeded_paths(size)
+        lookups = generate_lookups(seeded, lookups_count)
+
+        # 线性扫描非常慢，按预算限制查询次数，结果按单次耗时折算
+        linear_lookups = lookups[:max(1, linear_budget // size)]
+        linear = time_per_lookup(lambda p: linear_contains(seeded, p), linear_lookups)
+        print(f"{size:>12} {'linear':>8} {'-':>10} {'-':>10} {linear * 1e6:>12.1f} {'1x':>10}")
+
+        for name, factory in (("trie", SeededPathIndex), ("compact", CompactPathIndex)):
+            index, build_time, index_bytes = build(factory, seeded)
+            per_lookup = time_per_lookup(index.contains, lookups)
+
+            # 各实现的结论必须一致
+            for path in linear_lookups:
+                assert linear_contains(seeded, path) == index.contains(path), (name, path)
+
+            print(
+                f"{size:>12} {name:>8} {build_time:>10.3f} {index_bytes / (1024 * 1024):>10.1f} "
+                f"{per_lookup * 1e6:>12.2f} {linear / per_lookup:>9.0f}x"
+            )
+            del index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="做种路径索引微基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--lookups", type=int, default=100_000, help="索引查询次数")
+    parser.add_argument("--linear-budget", type=int, default=20_000_000,
+                        help="线性比对的总比较次数上限")
+    args = parser.parse_args()
+    run(args.sizes, args.lookups, args.linear_budget)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+模拟下载器 HTTP 服务
+
+只实现 Void 用到的接口，供基准测试在本机提供任意数量的合成种子：
+- qBittorrent WebUI API v2: auth/login、app/version、app/webapiVersion、
+  torrents/info、torrents/files、sync/maindata
+- Transmission RPC: session-get、torrent-get（支持 ids 与 fields），含 X-Transmission-Session-Id 握手
+
+两个服务都在后台线程运行，port=0 时由系统分配端口
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.tree_gen import SyntheticTorrent
+
+_SESSION_ID = "void-benchmark-session"
+
+
+class _BaseServer:
+    handler_class = BaseHTTPRequestHandler
+
+    def __init__(self, torrents: List[SyntheticTorrent], host: str = "127.0.0.1", port: int = 0):
+        self.torrents = torrents
+        self.requests = 0
+        self._server = ThreadingHTTPServer((host, port), self.handler_class)
+        self._server.daemon_threads = True
+        self._server.owner = self
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 响应头与响应体分两次写出，keep-alive 下 Nagle 算法会与延迟确认叠加出约 40ms 的等待
+    disable_nagle_algorithm = True
+
+    @property
+    def owner(self):
+        return self.server.owner
+
+    def _send(self, status: int, body, content_type: str = "application/json", headers: dict = None) -> None:
+        data = body if isinstance(body, bytes) else (
+            body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        )
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _QBittorrentHandler(_Handler):
+    def _params(self) -> dict:
+        params = parse_qs(urlparse(self.path).query)
+        if self.command == "POST":
+            params.update(parse_qs(self._read_body().decode()))
+        return {k: v[-1] for k, v in params.items()}
+
+    def _torrent_info(self, torrent: SyntheticTorrent) -> dict:
+        return {
+            "hash": torrent.hash,
+            "name": torrent.name,
+            "save_path": torrent.save_path,
+            "content_path": f"{torrent.save_path}/{torrent.name}",
+            "size": torrent.size * len(torrent.files),
+            "state": "uploading",
+        }
+
+    def _handle(self) -> None:
+        owner = self.owner
+        owner.requests += 1
+        path = urlparse(self.path).path
+        params = self._params()
+
+        if path == "/api/v2/auth/login":
+            self._send(200, "Ok.", "text/plain", {"Set-Cookie": "SID=benchmark; path=/"})
+        elif path == "/api/v2/app/version":
+            self._send(200, "v4.6.0", "text/plain")
+        elif path == "/api/v2/app/webapiVersion":
+            self._send(200, "2.9.3", "text/plain")
+        elif path == "/api/v2/torrents/info":
+            self._send(200, [self._torrent_info(t) for t in owner.torrents])
+        elif path == "/api/v2/torrents/files":
+            torrent = owner.by_hash.get(params.get("hash", ""))
+            if torrent is None:
+                self._send(404, "Not Found", "text/plain")
+                return
+            self._send(200, [
+                {"index": i, "name": name, "size": torrent.size, "progress": 1, "priority": 1}
+                for i, name in enumerate(torrent.files)
+            ])
+        elif path == "/api/v2/sync/maindata":
+            # 首次请求返回全量数据，之后种子集合不变，只返回空增量
+            rid = int(params.get("rid", 0) or 0)
+            if rid == 0:
+                body = {
+                    "rid": 1, "full_update": True,
+                    "torrents": {t.hash: self._torrent_info(t) for t in owner.torrents},
+                }
+            else:
+                body = {"rid": rid + 1}
+            self._send(200, body)
+        else:
+            self._send(404, "Not Found", "text/plain")
+
+    do_GET = _handle
+    do_POST = _handle
+
+
+class FakeQBittorrentServer(_BaseServer):
+    handler_class = _QBittorrentHandler
+
+    def __init__(self, torrents: List[SyntheticTorrent], host: str = "127.0.0.1", port: int = 0):
+        super().__init__(torrents, host, port)
+        self.by_hash = {t.hash: t for t in torrents}
+
+
+class _TransmissionHandler(_Handler):
+    def _torrent_fields(self, index: int, torrent: SyntheticTorrent, fields: List[str]) -> dict:
+        available = {
+            "id": index + 1,
+            "name": torrent.name,
+            "hashString": torrent.hash,
+            "downloadDir": torrent.save_path,
+            "files": [
+                {"name": name, "length": torrent.size, "bytesCompleted": torrent.size}
+                for name in torrent.files
+            ] if "files" in fields else None,
+        }
+        return {field: available[field] for field in fields if field in available}
+
+    def do_POST(self):
+        owner = self.owner
+        owner.requests += 1
+        body = self._read_body()
+        if self.headers.get("X-Transmission-Session-Id") != _SESSION_ID:
+            self._send(409, "", "text/plain", {"X-Transmission-Session-Id": _SESSION_ID})
+            return
+
+        request = json.loads(body or b"{}")
+        method = request.get("method")
+        arguments = request.get("arguments") or {}
+        tag = request.get("tag")
+
+        if method == "session-get":
+            result = {
+                "rpc-version": 17, "rpc-version-minimum": 14, "version": "4.0.5 (benchmark)",
+                "rpc-version-semver": "5.3.0",
+            }
+        elif method == "torrent-get":
+            fields = arguments.get("fields") or ["id", "name"]
+            ids = arguments.get("ids")
+            if ids is None:
+                selected = list(enumerate(owner.torrents))
+            else:
+                ids = ids if isinstance(ids, list) else [ids]
+                selected = []
+                for torrent_id in ids:
+                    if isinstance(torrent_id, int) and 1 <= torrent_id <= len(owner.torrents):
+                        selected.append((torrent_id - 1, owner.torrents[torrent_id - 1]))
+                    elif isinstance(torrent_id, str) and torrent_id in owner.index_by_hash:
+                        index = owner.index_by_hash[torrent_id]
+                        selected.append((index, owner.torrents[index]))
+            result = {"torrents": [self._torrent_fields(i, t, fields) for i, t in selected]}
+        else:
+            self._send(200, {"result": f"method not supported: {method}", "arguments": {}, "tag": tag})
+            return
+        self._send(200, {"result": "success", "arguments": result, "tag": tag})
+
+
+class FakeTransmissionServer(_BaseServer):
+    handler_class = _TransmissionHandler
+
+    def __init__(self, torrents: List[SyntheticTorrent], host: str = "127.0.0.1", port: int = 0):
+        super().__init__(torrents, host, port)
+        self.index_by_hash = {t.hash: i for i, t in enumerate(torrents)}
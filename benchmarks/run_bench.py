@@ -0,0 +1,197 @@
+"""
+端到端基准测试
+
+生成合成下载目录，启动模拟的 qBittorrent / Transmission 服务，
+分别计时普通模式 find_unseeded_files 与全局模式 find_unseeded_files_global，
+并通过 module.metrics 记录的阶段耗时拆分 fetch / index_build / walk。
+结果写入 JSON（含当前提交号），用于在不同提交之间对比。
+
+每个场景重复 --repeat 次：第 1 次为冷启动（新建客户端、全量同步），之后为热运行（复用客户端、增量同步）。
+
+运行方式（仓库根目录）:
+    python -m benchmarks.run_bench
+    python -m benchmarks.run_bench --torrents 5000 --files-per-torrent 20 --repeat 5 --output bench.json
+    python -m benchmarks.run_bench --precise --scan-workers 4
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.tree_gen import REMOTE_ROOT, TreeSpec, generate_tree
+from benchmarks.fake_servers import FakeQBittorrentServer, FakeTransmissionServer
+
+_DEFAULTS = TreeSpec._field_defaults
+
+
+def _git_revision() -> Dict[str, object]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def _stages(metrics, service_names: List[str], label: str) -> Dict[str, Optional[float]]:
+    """读取本次运行记录的阶段耗时，多个下载器的 fetch 取最大值（并发获取时决定总耗时）"""
+    result = {}
+    fetches = [metrics.value("stage_last_duration_seconds", stage="fetch", service=name) for name in service_names]
+    fetches = [v for v in fetches if v is not None]
+    result["fetch"] = max(fetches) if fetches else None
+    for stage in ("index_build", "walk"):
+        result[stage] = metrics.value("stage_last_duration_seconds", stage=stage, service=label)
+    return result
+
+
+def run(args) -> dict:
+    workdir = args.workdir or tempfile.mkdtemp(prefix="void-bench-")
+    tree_root = os.path.join(workdir, "tree")
+    # 日志与缓存文件写到临时目录，需在导入 module 之前设置
+    os.environ["LOG_PATH"] = os.path.join(workdir, "logs", "Void.log")
+
+    from module import client_pool, metrics, unseeded, global_scanner
+    from module.scan_scheduler import ScanScheduler
+    logging.getLogger("Void").setLevel(logging.WARNING)
+
+    spec = TreeSpec(
+        torrents=args.torrents, files_per_torrent=args.files_per_torrent, depth=args.depth,
+        seeded_ratio=args.seeded_ratio, file_size=args.file_size, seed=args.seed,
+    )
+    start = time.perf_counter()
+    tree = generate_tree(tree_root, spec)
+    generate_seconds = time.perf_counter() - start
+    print(f"[基准] 生成 {tree['files']} 个文件（孤立 {tree['orphan_files']} 个），耗时 {generate_seconds:.1f} 秒")
+
+    scheduler = ScanScheduler(args.scan_workers, args.scan_executor)
+    results = []
+
+    servers = {
+        "qbittorrent": FakeQBittorrentServer(tree["seeded"]),
+        "transmission": FakeTransmissionServer(tree["seeded"]),
+    }
+    for server in servers.values():
+        server.start()
+
+    try:
+        services = []
+        for client_type in args.clients:
+            server = servers[client_type]
+            services.append({
+                "name": f"bench-{client_type}", "type": client_type,
+                "host": server.host, "port": server.port, "username": "admin", "password": "admin",
+                "path_mapping": [{tree_root: REMOTE_ROOT}],
+                "precise_mode": args.precise,
+                "precise_max_fetch": args.torrents,
+            })
+
+        scenarios = [("normal", [service]) for service in services]
+        if args.global_mode:
+            scenarios.append(("global", services))
+
+        for mode, scenario_services in scenarios:
+            names = [s["name"] for s in scenario_services]
+            unseeded.prune_services([])  # 冷启动：丢弃客户端与同步状态
+            for repeat in range(args.repeat):
+                start = time.perf_counter()
+                if mode == "normal":
+                    found, errors = unseeded.find_unseeded_files(
+                        scenario_services[0], 0, set(), scheduler=scheduler
+                    )
+                else:
+                    found, errors = global_scanner.find_unseeded_files_global(
+                        scenario_services, [tree_root], 0, set(), scheduler=scheduler
+                    )
+                total = time.perf_counter() - start
+
+                entry = {
+                    "mode": mode,
+                    "services": names,
+                    "run": repeat,
+                    "cold": repeat == 0,
+                    "total_seconds": total,
+                    "stages": _stages(
+                        metrics, names, names[0] if mode == "normal" else global_scanner.GLOBAL_SERVICE_NAME
+                    ),
+                    "found": len(found),
+                    "expected": tree["orphan_files"],
+                    "errors": errors,
+                }
+                results.append(entry)
+                stage_str = " ".join(
+                    f"{k}={v:.3f}s" for k, v in entry["stages"].items() if v is not None
+                )
+                print(
+                    f"[基准] {mode:<6} {'+'.join(names):<40} 第 {repeat + 1} 次: {total:.3f}s ({stage_str}) "
+                    f"发现 {len(found)}/{tree['orphan_files']}"
+                )
+    finally:
+        for server in servers.values():
+            server.stop()
+        client_pool.prune([])
+
+    summary = {}
+    for entry in results:
+        key = f"{entry['mode']}:{'+'.join(entry['services'])}"
+        summary.setdefault(key, []).append(entry["total_seconds"])
+
+    return {
+        **_git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": {**spec._asdict(), "precise": args.precise, "scan_workers": args.scan_workers,
+                   "scan_executor": args.scan_executor, "repeat": args.repeat},
+        "tree": {"root": tree_root, "files": tree["files"], "orphan_files": tree["orphan_files"],
+                 "generate_seconds": generate_seconds},
+        "results": results,
+        "summary": {
+            key: {"cold_seconds": values[0], "warm_median_seconds": statistics.median(values[1:]) if len(values) > 1 else None}
+            for key, values in summary.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Void 端到端基准测试")
+    parser.add_argument("--torrents", type=int, default=2000)
+    parser.add_argument("--files-per-torrent", type=int, default=10)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--seeded-ratio", type=float, default=0.9)
+    parser.add_argument("--file-size", type=int, default=_DEFAULTS["file_size"])
+    parser.add_argument("--seed", type=int, default=_DEFAULTS["seed"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--clients", nargs="+", default=["qbittorrent", "transmission"],
+                        choices=["qbittorrent", "transmission"])
+    parser.add_argument("--no-global", dest="global_mode", action="store_false", help="不运行全局模式场景")
+    parser.add_argument("--precise", action="store_true", help="启用精确模式（按文件列表匹配）")
+    parser.add_argument("--scan-workers", type=int, default=1)
+    parser.add_argument("--scan-executor", default="thread", choices=["thread", "process"])
+    parser.add_argument("--workdir", help="生成目录树的位置，默认使用临时目录")
+    parser.add_argument("--output", help="结果 JSON 文件，默认输出到标准输出")
+    args = parser.parse_args()
+
+    result = run(args)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"[基准] 结果已写入 {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
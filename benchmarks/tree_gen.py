@@ -0,0 +1,124 @@
+"""
+合成下载目录生成器
+
+按 PT 下载目录的典型结构生成目录树：<根目录>/<分类>/<种子名称>/<若干层子目录>/<文件>，
+部分种子为单文件种子。所有文件都是稀疏文件（只截断到指定大小，不写入数据），
+生成百万级文件也几乎不占磁盘空间。
+
+seeded_ratio 决定多少种子会注册到模拟下载器中，其余种子目录即为待发现的孤立文件。
+
+运行方式（仓库根目录）:
+    python -m benchmarks.tree_gen /tmp/void-tree --torrents 1000 --files-per-torrent 20
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+from typing import Dict, List, NamedTuple
+
+CATEGORIES = ["movies", "tv", "music", "anime", "docs", "games"]
+
+# 模拟下载器内的保存路径前缀，运行基准时通过 path_mapping 映射到生成的根目录
+REMOTE_ROOT = "/downloads"
+
+
+class SyntheticTorrent(NamedTuple):
+    """模拟下载器返回的种子"""
+    hash: str
+    name: str
+    save_path: str          # 下载器内的路径
+    files: List[str]        # 相对 save_path 的文件路径（使用 /）
+    size: int               # 单个文件大小
+
+
+class TreeSpec(NamedTuple):
+    torrents: int = 1000
+    files_per_torrent: int = 10
+    depth: int = 2
+    seeded_ratio: float = 0.9
+    single_file_ratio: float = 0.2
+    file_size: int = 200 * 1024 * 1024
+    seed: int = 42
+
+
+_DEFAULTS = TreeSpec._field_defaults
+
+
+def _make_sparse(path: str, size: int) -> None:
+    with open(path, "wb") as f:
+        f.truncate(size)
+
+
+def generate_tree(root: str, spec: TreeSpec) -> Dict[str, object]:
+    """
+    在 root 下生成目录树
+
+    Returns:
+        {"seeded": [SyntheticTorrent], "orphans": [SyntheticTorrent], "files": 文件总数, "orphan_files": 孤立文件数}
+    """
+    rng = random.Random(spec.seed)
+    seeded: List[SyntheticTorrent] = []
+    orphans: List[SyntheticTorrent] = []
+    total_files = 0
+
+    for i in range(spec.torrents):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        torrent_hash = hashlib.sha1(f"{spec.seed}-{i}".encode()).hexdigest()
+        local_dir = os.path.join(root, category)
+
+        if rng.random() < spec.single_file_ratio:
+            name = f"Single.File.{i:07d}.mkv"
+            files = [name]
+        else:
+            name = f"Torrent.Name.{i:07d}.2160p.WEB-DL"
+            files = []
+            for j in range(spec.files_per_torrent):
+                nested = "/".join(f"d{rng.randrange(3)}" for _ in range(rng.randrange(spec.depth + 1)))
+                files.append("/".join(part for part in (name, nested, f"E{j:04d}.mkv") if part))
+
+        for relative in files:
+            path = os.path.join(local_dir, *relative.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _make_sparse(path, spec.file_size)
+        total_files += len(files)
+
+        torrent = SyntheticTorrent(torrent_hash, name, f"{REMOTE_ROOT}/{category}", files, spec.file_size)
+        (seeded if rng.random() < spec.seeded_ratio else orphans).append(torrent)
+
+    return {
+        "seeded": seeded,
+        "orphans": orphans,
+        "files": total_files,
+        "orphan_files": sum(len(t.files) for t in orphans),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成下载目录")
+    parser.add_argument("root")
+    parser.add_argument("--torrents", type=int, default=_DEFAULTS["torrents"])
+    parser.add_argument("--files-per-torrent", type=int, default=_DEFAULTS["files_per_torrent"])
+    parser.add_argument("--depth", type=int, default=_DEFAULTS["depth"])
+    parser.add_argument("--seeded-ratio", type=float, default=_DEFAULTS["seeded_ratio"])
+    parser.add_argument("--file-size", type=int, default=_DEFAULTS["file_size"])
+    parser.add_argument("--seed", type=int, default=_DEFAULTS["seed"])
+    args = parser.parse_args()
+
+    spec = TreeSpec(
+        torrents=args.torrents, files_per_torrent=args.files_per_torrent, depth=args.depth,
+        seeded_ratio=args.seeded_ratio, file_size=args.file_size, seed=args.seed,
+    )
+    result = generate_tree(args.root, spec)
+    print(json.dumps({
+        "root": args.root,
+        "files": result["files"],
+        "seeded_torrents": len(result["seeded"]),
+        "orphan_torrents": len(result["orphans"]),
+        "orphan_files": result["orphan_files"],
+    }, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
-import os
+import argparse
 import time
 import signal
 import sys
 import threading
 import schedule
 from tools import logs, config as config_tool
-from module import notification, unseeded, global_scanner
+from module import notification, unseeded, inventory, inventory_snapshot
+from module.runtime_plan import RuntimePlan, activate_plan, compile_plan
+# 只在部分运行方式中用到的模块（实时监控、全局模式、性能剖析、指标服务等）在使用处导入，
+# 一次性运行（--once）不承担它们的启动开销
 
 
 # 初始化日志
@@ -14,169 +17,304 @@ logger = logs.logs_configuration()
 # 全局退出标志
 exit_event = threading.Event()
 
+# SIGUSR1 置位，由主循环消费
+profile_requested = threading.Event()
+
+# --once 模式的退出码
+EXIT_OK = 0         # 本轮完成
+EXIT_FAILED = 1     # 配置错误、任务异常或被信号中断
+EXIT_PARTIAL = 2    # 本轮完成，但部分下载器获取失败或扫描出错
+
 def handle_exit(signum, frame):
     """处理 Docker 停止信号 (SIGTERM/SIGINT)"""
     logger.info(f"--- 收到信号 {signum}, 正在安全退出... ---")
     exit_event.set()
 
+def handle_profile_request(signum, frame):
+    """SIGUSR1：只置位标志，剖析在主循环中执行"""
+    profile_requested.set()
+
 # 注册信号
 signal.signal(signal.SIGTERM, handle_exit)
 signal.signal(signal.SIGINT, handle_exit)
+# SIGUSR1: 立即执行一轮带性能剖析的扫描（Windows 无此信号）
+if hasattr(signal, "SIGUSR1"):
+    signal.signal(signal.SIGUSR1, handle_profile_request)
 
-def get_size_mb(path: str) -> float:
-    try:
-        if os.path.exists(path):
-            return os.path.getsize(path) / (1024 * 1024)
-    except Exception:
-        return 0.0
+def _run_cleanup(name: str, records, auto_remove: bool, workers: int, protected_roots, results=None, reason=None):
+    """处理扫描结果并记录指标；delete 阶段耗时不含等待扫描生成器的时间；results 为本轮的结果文件"""
+    from module import cleanup, metrics
 
-def remove_empty_folders(path: str):
-    """递归清理空目录"""
-    try:
-        if not os.path.isdir(path) or exit_event.is_set():
-            return
-        if not os.listdir(path):
-            os.rmdir(path)
-            logger.info(f"[清理] 已删除空目录: {path}")
-            remove_empty_folders(os.path.dirname(path))
-    except Exception:
-        pass
-
-def process_cleanup(file_list: list):
-    """物理删除逻辑"""
-    actual_deleted = []
-    for file_path in file_list:
-        if exit_event.is_set(): break # 停止期间不再执行后续删除
-        try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                actual_deleted.append(file_path)
-                logger.info(f"[删除] 成功: {file_path}")
-                remove_empty_folders(os.path.dirname(file_path))
-        except Exception as e:
-            logger.error(f"[删除] 失败 {file_path}: {e}")
-    return actual_deleted
-
-def main_task_normal_mode(config: dict):
-    """普通模式：每个下载器独立扫描"""
-    services = config.get('services', [])
-    min_size = config.get('checkfile_size', 0)
-    excluded = set(config.get('excluded_paths', []))
-    auto_remove = config.get('enable_auto_remove', False)
-
-    for item in services:
+    records = metrics.TimedIterator(records)
+    start = time.perf_counter()
+    summary = cleanup.run_cleanup(
+        records, auto_remove, exit_event, notification.REPORT_FILE_LIMIT,
+        protected_roots=protected_roots, workers=workers,
+        on_result=results.sink(name, reason) if results else None
+    )
+    metrics.observe_stage("delete", time.perf_counter() - start - records.elapsed, service=name)
+    metrics.record_cleanup(summary, auto_remove, name)
+    return summary
+
+def main_task_normal_mode(plan: RuntimePlan, cache=None, results=None) -> bool:
+    """普通模式：每个下载器独立扫描，有下载器出错时返回 False"""
+    from module import scan_output
+
+    config = plan.config
+    services = list(plan.services)
+    min_size = plan.min_size
+    excluded = plan.exclusions
+    auto_remove = plan.auto_remove
+    delete_workers = plan.delete_workers
+    scheduler = plan.scheduler
+    ok = True
+
+    # 所有下载器并发获取种子数据，按完成顺序逐个扫描
+    for item, service_inventory in inventory.iter_inventories(
+        services, path_mappers=plan.path_mappers, **plan.fetch_options
+    ):
         if exit_event.is_set(): 
             break
         
         name = item.get('name', 'Unknown')
         logger.info(f"--- 正在扫描服务: {name} ---")
         
-        files_to_remove, error_messages = unseeded.find_unseeded_files(
+        records, error_messages = unseeded.stream_unseeded_files(
             services=item, 
             check_file_size=min_size, 
-            excluded_paths=excluded
+            excluded_paths=excluded,
+            cache=cache,
+            inventory=service_inventory,
+            scheduler=scheduler
         )
-    
-        if files_to_remove:
-            total_size = sum(get_size_mb(f) for f in files_to_remove)
-            deleted_info = {"deleted_files": files_to_remove, "total_size": total_size}
+        if error_messages:
+            ok = False
+            notification.send_notification(item, config, False, error=error_messages)
+            continue
 
-            if auto_remove:
-                process_cleanup(files_to_remove)
-                notification.send_notification(item, config, True, deleted_info=deleted_info)
+        # 快照中缺少下载器停机期间新增的种子，据此判断的文件只报告不删除
+        service_remove, service_config = auto_remove, config
+        if service_inventory.stale and auto_remove:
+            logger.warning(f"[扫描] {name} 使用快照数据，本轮不执行自动删除，仅报告")
+            service_remove, service_config = False, {**config, 'enable_auto_remove': False}
+
+        # 边扫描边处理：自动清理模式下删除与目录遍历同时进行
+        summary = _run_cleanup(
+            name, records, service_remove, delete_workers,
+            protected_roots={unseeded.normalize_path(p) for p in service_inventory.save_paths},
+            results=results, reason=scan_output.REASON_SERVICE
+        )
+        if summary.file_count:
+            if service_remove:
+                logger.info(f"[删除] 已删除 {summary.file_count} 个文件")
             else:
-                logger.info(f"[报告] 发现 {len(files_to_remove)} 个文件 (预览模式)")
-                notification.send_notification(item, config, True, deleted_info=deleted_info)
+                logger.info(f"[报告] 发现 {summary.file_count} 个文件 (预览模式)")
+            notification.send_notification(item, service_config, True, deleted_info=summary.to_report())
         else:
-            if error_messages:
-                notification.send_notification(item, config, False, error=error_messages)
-            else:
-                logger.info(f"[扫描] {name} 目录整洁")
+            logger.info(f"[扫描] {name} 目录整洁")
+    return ok
 
 
-def main_task_global_mode(config: dict):
-    """全局模式：扫描共享目录并跨所有下载器检查"""
-    global_scan_config = config.get('global_scan', {})
-    services = config.get('services', [])
-    scan_paths = global_scan_config.get('scan_paths', [])
-    min_size = config.get('checkfile_size', 0)
-    excluded = set(config.get('excluded_paths', []))
-    auto_remove = config.get('enable_auto_remove', False)
+def main_task_global_mode(plan: RuntimePlan, cache=None, results=None) -> bool:
+    """全局模式：扫描共享目录并跨所有下载器检查，配置缺失或有下载器出错时返回 False"""
+    from module import global_scanner, scan_output
+
+    config = plan.config
+    services = list(plan.services)
+    scan_paths = list(plan.scan_paths)
+    min_size = plan.min_size
+    excluded = plan.exclusions
+    auto_remove = plan.auto_remove
+    delete_workers = plan.delete_workers
+    fetch_options = plan.fetch_options
     
     if not services:
         logger.error("[全局扫描] 未配置任何下载器服务")
-        return
+        return False
     
     if not scan_paths:
         logger.error("[全局扫描] 未配置扫描路径")
-        return
+        return False
     
     # 执行全局扫描
-    files_to_remove, error_messages = global_scanner.find_unseeded_files_global(
+    stale_services = []
+    records, error_messages = global_scanner.stream_unseeded_files_global(
         services=services,
         scan_paths=scan_paths,
         check_file_size=min_size,
-        excluded_paths=excluded
+        excluded_paths=excluded,
+        cache=cache,
+        fetch_workers=fetch_options["max_workers"],
+        fetch_timeout=fetch_options["timeout"],
+        scheduler=plan.scheduler,
+        path_mappers=plan.path_mappers,
+        stale_services=stale_services
     )
+
+    # 有下载器既无法获取也没有可用快照时，它的做种文件会被误判为未做种；
+    # 使用快照的下载器缺少停机期间新增的种子，同样本轮只报告不删除
+    if (error_messages or stale_services) and auto_remove:
+        if error_messages:
+            logger.warning("[全局扫描] 部分下载器数据缺失，本轮不执行自动删除，仅报告")
+        else:
+            logger.warning(f"[全局扫描] {', '.join(stale_services)} 使用快照数据，本轮不执行自动删除，仅报告")
+        auto_remove = False
+        config = {**config, 'enable_auto_remove': False}
     
-    # 处理扫描结果
-    if files_to_remove:
-        total_size = sum(get_size_mb(f) for f in files_to_remove)
-        deleted_info = {"deleted_files": files_to_remove, "total_size": total_size}
-        
+    # 处理扫描结果：边扫描边处理，自动清理模式下删除与目录遍历同时进行
+    summary = _run_cleanup(
+        global_scanner.GLOBAL_SERVICE_NAME, records, auto_remove, delete_workers,
+        protected_roots={unseeded.normalize_path(p) for p in scan_paths},
+        results=results, reason=scan_output.REASON_GLOBAL
+    )
+    if summary.file_count:
         if auto_remove:
-            logger.info(f"[全局扫描] 准备删除 {len(files_to_remove)} 个文件")
-            process_cleanup(files_to_remove)
-            notification.send_notification(
-                {"name": "GlobalScan", "type": "global"}, 
-                config, 
-                True, 
-                deleted_info=deleted_info
-            )
+            logger.info(f"[全局扫描] 已删除 {summary.file_count} 个文件")
         else:
-            logger.info(f"[全局扫描] 发现 {len(files_to_remove)} 个未做种文件 (预览模式)")
-            notification.send_notification(
-                {"name": "GlobalScan", "type": "global"}, 
-                config, 
-                True, 
-                deleted_info=deleted_info
-            )
+            logger.info(f"[全局扫描] 发现 {summary.file_count} 个未做种文件 (预览模式)")
+        notification.send_notification(
+            {"name": global_scanner.GLOBAL_SERVICE_NAME, "type": "global"}, 
+            config, 
+            True, 
+            deleted_info=summary.to_report()
+        )
     else:
         if error_messages:
             logger.warning(f"[全局扫描] 完成，但有错误: {error_messages}")
             notification.send_notification(
-                {"name": "GlobalScan", "type": "global"}, 
+                {"name": global_scanner.GLOBAL_SERVICE_NAME, "type": "global"}, 
                 config, 
                 False, 
                 error=error_messages
             )
         else:
             logger.info("[全局扫描] 完成，所有文件都在做种中")
+    return not error_messages
 
 
-def main_task():
-    """主任务入口：根据配置自动选择扫描模式"""
-    config = config_tool.yaml_configuration()
-    
-    # 检查是否启用全局扫描模式
-    global_scan_config = config.get('global_scan', {})
-    is_global_mode = global_scan_config.get('enabled', False)
-    
-    if is_global_mode:
-        logger.info("[模式] 全局扫描模式")
-        main_task_global_mode(config)
+# 配置文件只在内容变化时重新解析，运行计划随之重新编译
+config_manager = config_tool.ConfigManager()
+_plan = None
+_plan_lock = threading.Lock()
+# 编译失败的配置版本，文件再次变化前不重复编译（也不重复输出错误）
+_failed_version = None
+
+
+def current_plan() -> RuntimePlan:
+    """返回与当前配置文件对应的运行计划；配置无法编译时继续使用上一版（启动时没有上一版则抛出异常）"""
+    global _plan, _failed_version
+    config = config_manager.load()
+    with _plan_lock:
+        version = config_manager.version
+        if _plan is None or (_plan.version != version and _failed_version != version):
+            try:
+                plan = compile_plan(config, version, _plan)
+            except Exception as e:
+                if _plan is None:
+                    raise
+                _failed_version = version
+                logger.error(f"[读取配置] 第 {version} 版配置无法生效，继续使用第 {_plan.version} 版: {e}")
+                return _plan
+            # 编译成功后才替换计划并同步各模块状态
+            activate_plan(plan)
+            _plan = plan
+        return _plan
+
+
+def main_task(profile: bool = False) -> bool:
+    """
+    主任务入口：根据配置自动选择扫描模式；profile 为 True 或配置启用剖析时记录性能剖析报告
+    本轮有下载器出错时返回 False
+    """
+    plan = current_plan()
+    if profile or plan.profile_every_cycle:
+        from module import profiling
+
+        return profiling.run_profiled(lambda: run_cycle(plan), plan.config)
+    return run_cycle(plan)
+
+
+def run_cycle(plan: RuntimePlan) -> bool:
+    """执行一轮扫描"""
+    from module import metrics, scan_cache, scan_output
+
+    config = plan.config
+
+    # 增量扫描缓存（可选），每轮打开一次，结束时写回
+    cache = scan_cache.from_config(config)
+    # 完整结果文件（可选），边扫描边写入
+    results = scan_output.from_config(config, "global" if plan.global_mode else "normal")
+    start = time.perf_counter()
+    complete = False
+    try:
+        # 本轮所有下载器的报告合并后由后台线程发送
+        with notification.batch(config):
+            if plan.global_mode:
+                logger.info("[模式] 全局扫描模式")
+                ok = main_task_global_mode(plan, cache, results)
+            else:
+                logger.info("[模式] 普通扫描模式")
+                ok = main_task_normal_mode(plan, cache, results)
+        metrics.set_gauge("cycle_last_success_timestamp_seconds", "最后一次完成扫描任务的时间", time.time())
+        complete = not exit_event.is_set()
+        return ok
+    finally:
+        if cache:
+            cache.close()
+        if results:
+            results.close(complete)
+        metrics.set_gauge("cycle_last_duration_seconds", "最近一轮扫描任务耗时", time.perf_counter() - start)
+
+
+def _drain_notifications() -> None:
+    """发送队列中剩余的通知"""
+    notification.shutdown(float(current_plan().config.get('notification_drain_timeout', notification.DEFAULT_DRAIN_TIMEOUT)))
+
+
+def run_once() -> int:
+    """
+    一次性运行（如 Kubernetes CronJob）：执行一轮任务，发送完通知后返回退出码
+    不启动指标服务与实时监控，也不使用 fast_startup（唯一的一轮必须实时获取）
+    """
+    plan = current_plan()
+    inventory_snapshot.skip_startup()
+    mode_name = "全局扫描模式" if plan.global_mode else "普通模式"
+    logger.info(f"===== Void 单次运行 ({mode_name}) =====")
+    try:
+        ok = main_task()
+    except Exception as e:
+        logger.exception(f"[单次运行] 任务异常: {e}")
+        status = EXIT_FAILED
     else:
-        logger.info("[模式] 普通扫描模式")
-        main_task_normal_mode(config)
+        if exit_event.is_set():
+            status = EXIT_FAILED
+        else:
+            status = EXIT_OK if ok else EXIT_PARTIAL
+    _drain_notifications()
+    logger.info(f"===== 单次运行结束，退出码 {status} =====")
+    return status
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Void: 清理下载器中未做种的文件")
+    parser.add_argument(
+        "--once", action="store_true",
+        help=f"只执行一轮任务后退出；退出码 {EXIT_OK} 成功，{EXIT_PARTIAL} 部分下载器出错，{EXIT_FAILED} 失败"
+    )
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    init_config = config_tool.yaml_configuration()
-    interval = init_config.get('check_interval', 60)
+    if parse_args().once:
+        sys.exit(run_once())
+
+    init_plan = current_plan()
+    init_config = init_plan.config
+    interval = init_plan.check_interval
     
     # 检测运行模式
     global_scan_config = init_config.get('global_scan', {})
-    is_global_mode = global_scan_config.get('enabled', False)
+    is_global_mode = init_plan.global_mode
     mode_name = "全局扫描模式" if is_global_mode else "普通模式"
 
     logger.info(f"===== Void 服务 已启动 ({mode_name}) =====")
@@ -188,18 +326,57 @@ if __name__ == "__main__":
         logger.info(f"扫描目录: {scan_paths}")
         logger.info(f"下载器数量: {len(init_config.get('services', []))}")
     
+    # 指标 HTTP 服务（可选）
+    if (init_config.get('metrics') or {}).get('enabled', False):
+        from module import metrics
+
+        metrics.start_server(init_config)
+
     # 立即执行一次
     main_task()
 
+    # 实时监控模式（可选）：变化的文件实时判断，完整扫描降级为低频兜底
+    watch_config = init_config.get('watch_mode') or {}
+    dir_watcher = None
+    if watch_config.get('enabled', False):
+        from module import watcher
+
+        dir_watcher = watcher.start_watcher(current_plan, exit_event)
+        if dir_watcher:
+            interval = init_plan.schedule_interval(watching=True)
+            logger.info(f"[实时监控] 已启用，完整扫描改为每 {interval} 分钟执行一次")
+
     # 注册定时器
-    schedule.every(interval).minutes.do(main_task)
+    job = schedule.every(interval).minutes.do(main_task)
+    last_reload_check = time.monotonic()
 
     # 优雅的循环
     while not exit_event.is_set():
         schedule.run_pending()
+        # 定期检查配置文件（未变化时只有一次 stat），周期变化时重新注册定时器
+        if time.monotonic() - last_reload_check >= config_tool.RELOAD_CHECK_SECONDS:
+            last_reload_check = time.monotonic()
+            new_interval = current_plan().schedule_interval(watching=dir_watcher is not None)
+            if new_interval != interval:
+                schedule.cancel_job(job)
+                job = schedule.every(new_interval).minutes.do(main_task)
+                logger.info(f"[读取配置] 执行周期由 {interval} 分钟调整为 {new_interval} 分钟")
+                interval = new_interval
+        # inotify 事件溢出等情况下立即补一次完整扫描
+        if dir_watcher and dir_watcher.reconcile_event.is_set():
+            dir_watcher.reconcile_event.clear()
+            main_task()
+        # 收到 SIGUSR1 后立即执行一轮带剖析的扫描
+        if profile_requested.is_set():
+            profile_requested.clear()
+            logger.info("[性能剖析] 收到剖析请求")
+            main_task(profile=True)
         # 每隔 1 秒检查一次退出标志，而不是阻塞在这里
         if exit_event.wait(timeout=1):
             break
             
+    if dir_watcher:
+        dir_watcher.join(timeout=5)
+    _drain_notifications()
     logger.info("===== 程序已安全停止 =====")
     sys.exit(0)
\ No newline at end of file
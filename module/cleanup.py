@@ -0,0 +1,210 @@
+"""
+扫描结果处理流水线
+
+扫描生成器产出的未做种文件按所在目录分批，交给小型线程池并发删除（对网络文件系统尤其有效），
+删除与目录遍历同时进行；全部删除完成后，被清空的目录按深度从深到浅各尝试删除一次。
+报告只保留统计数据和少量示例路径，内存占用不随候选文件数量增长；
+释放空间只计入最后一个链接也被删除的 inode，删除硬链接中的一个不会释放空间
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from tools import logs
+from module.scanner import FileRecord
+from module.scan_output import ACTION_DELETED, ACTION_FAILED, ACTION_REPORT
+
+logger = logs.logs_configuration()
+
+DEFAULT_DELETE_WORKERS = 4
+
+# 单个删除批次的最大文件数
+BATCH_SIZE = 256
+
+
+class CleanupSummary:
+    """单轮处理结果的统计"""
+
+    def __init__(self, sample_limit: int):
+        self.sample_limit = sample_limit
+        self.file_count = 0
+        self.total_bytes = 0
+        self.freed_bytes = 0
+        self.failed = 0
+        self.removed_dirs = 0
+        self.elapsed = 0.0
+        self.sample: List[str] = []
+        # 多链接 inode 已处理的链接数，达到链接总数时才算释放了空间
+        self._links: Dict[Tuple[int, int], int] = {}
+
+    def add(self, record: FileRecord) -> None:
+        self.file_count += 1
+        self.total_bytes += record.size
+        if record.nlink <= 1:
+            self.freed_bytes += record.size
+        else:
+            key = (record.dev, record.ino)
+            seen = self._links.get(key, 0) + 1
+            if seen >= record.nlink:
+                self._links.pop(key, None)
+                self.freed_bytes += record.size
+            else:
+                self._links[key] = seen
+        if len(self.sample) < self.sample_limit:
+            self.sample.append(record.path)
+
+    def to_report(self) -> dict:
+        """转换为 notification.report 使用的 deleted_info，大小为实际释放（可释放）的空间"""
+        return {
+            "deleted_files": self.sample,
+            "file_count": self.file_count,
+            "total_size": self.freed_bytes / (1024 * 1024),
+        }
+
+
+def _delete_batch(batch: List[FileRecord], stop_event: threading.Event) -> Tuple[List[FileRecord], List[FileRecord]]:
+    """删除同一目录下的一批文件，返回 (删除成功的记录, 删除失败的记录)"""
+    deleted = []
+    failed = []
+    for record in batch:
+        if stop_event.is_set():
+            break # 停止期间不再执行后续删除
+        try:
+            os.unlink(record.path)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            failed.append(record)
+            logger.error(f"[删除] 失败 {record.path}: {e}")
+            continue
+        deleted.append(record)
+        logger.info(f"[删除] 成功: {record.path}")
+    return deleted, failed
+
+
+def remove_emptied_dirs(dirs: Set[str], protected_roots: Set[str], stop_event: threading.Event) -> int:
+    """
+    删除被清空的目录
+
+    候选目录包含发生过删除的目录及其直到扫描根目录（不含）的所有上级目录，
+    按深度从深到浅各 rmdir 一次；非空目录 rmdir 直接失败，无需先列目录
+    """
+    candidates = set()
+    for path in dirs:
+        while path not in protected_roots and path not in candidates:
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            candidates.add(path)
+            path = parent
+
+    removed = 0
+    for path in sorted(candidates, key=lambda p: p.count(os.sep), reverse=True):
+        if stop_event.is_set():
+            break
+        try:
+            os.rmdir(path)
+        except OSError:
+            continue
+        removed += 1
+        logger.info(f"[清理] 已删除空目录: {path}")
+    return removed
+
+
+# 单个文件的处理结果回调：(记录, module.scan_output 中的 ACTION_*)
+ResultCallback = Callable[[FileRecord, str], None]
+
+
+def _merge(future: Future, summary: CleanupSummary, on_result: Optional[ResultCallback]) -> None:
+    deleted, failed = future.result()
+    for record in deleted:
+        summary.add(record)
+    summary.failed += len(failed)
+    if on_result is not None:
+        for record in deleted:
+            on_result(record, ACTION_DELETED)
+        for record in failed:
+            on_result(record, ACTION_FAILED)
+
+
+def run_cleanup(
+    records: Iterable[FileRecord],
+    auto_remove: bool,
+    stop_event: threading.Event,
+    sample_limit: int = 15,
+    protected_roots: Iterable[str] = (),
+    workers: int = DEFAULT_DELETE_WORKERS,
+    on_result: Optional[ResultCallback] = None,
+) -> CleanupSummary:
+    """
+    消费扫描生成器
+
+    - 预览模式：只做统计
+    - 自动清理：按目录分批并发删除，与扫描同时进行，统计的是实际删除成功的文件
+
+    Args:
+        records: 扫描产出的未做种文件
+        auto_remove: 是否执行删除
+        stop_event: 退出标志
+        sample_limit: 报告中保留的示例路径数量
+        protected_roots: 扫描根目录，清理空目录时不会删除这些目录及其上级
+        workers: 删除线程数
+        on_result: 每个文件处理完成后在调用线程中回调，用于输出完整结果
+    """
+    summary = CleanupSummary(sample_limit)
+
+    if not auto_remove:
+        for record in records:
+            if stop_event.is_set():
+                break
+            summary.add(record)
+            if on_result is not None:
+                on_result(record, ACTION_REPORT)
+        return summary
+
+    start = time.perf_counter()
+    touched_dirs: Set[str] = set()
+    in_flight: deque = deque()
+    max_in_flight = max(1, workers) * 2
+    batch: List[FileRecord] = []
+    batch_dir = None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="cleanup") as executor:
+        def submit():
+            in_flight.append(executor.submit(_delete_batch, batch, stop_event))
+            # 限制排队中的批次数量，删除跟不上时扫描会在此等待
+            while len(in_flight) > max_in_flight:
+                _merge(in_flight.popleft(), summary, on_result)
+
+        for record in records:
+            if stop_event.is_set():
+                break
+            parent = os.path.dirname(record.path)
+            if batch and (parent != batch_dir or len(batch) >= BATCH_SIZE):
+                submit()
+                batch = []
+            batch_dir = parent
+            touched_dirs.add(parent)
+            batch.append(record)
+        if batch:
+            submit()
+
+        while in_flight:
+            _merge(in_flight.popleft(), summary, on_result)
+
+    summary.removed_dirs = remove_emptied_dirs(touched_dirs, set(protected_roots), stop_event)
+    summary.elapsed = time.perf_counter() - start
+
+    if summary.file_count:
+        elapsed = max(summary.elapsed, 1e-6)
+        logger.info(
+            f"[删除] 完成: {summary.file_count} 个文件 / {summary.total_bytes / (1024 * 1024):.2f} MB"
+            f"（释放 {summary.freed_bytes / (1024 * 1024):.2f} MB），"
+            f"失败 {summary.failed} 个，清理空目录 {summary.removed_dirs} 个，耗时 {summary.elapsed:.2f} 秒 "
+            f"({summary.file_count / elapsed:.1f} 文件/秒, {summary.total_bytes / (1024 * 1024) / elapsed:.2f} MB/秒)"
+        )
+    return summary
@@ -0,0 +1,91 @@
+"""
+下载器客户端注册表
+
+客户端按服务名称缓存并跨 schedule 轮次复用：
+- 复用 HTTP keep-alive 连接，不再每轮重新握手和登录（避免 qBittorrent 因频繁登录封禁 IP）
+- qBittorrent 会话过期时由 qbittorrentapi 在收到 403 后自动重新登录
+- 服务的连接配置变化、服务被移除或请求失败时丢弃对应客户端，下次使用时重建
+
+qbittorrentapi 与 transmission_rpc 在首次创建对应类型的客户端时才导入，只配置一种下载器时不加载另一种
+"""
+
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from tools import logs
+
+logger = logs.logs_configuration()
+
+_clients: Dict[str, Tuple[tuple, object]] = {}
+_lock = threading.Lock()
+
+
+def _fingerprint(config: dict) -> tuple:
+    """决定能否复用客户端的连接参数"""
+    return (
+        config.get("type", "").lower(), config.get("host"), config.get("port"),
+        config.get("username"), config.get("password"),
+    )
+
+
+def create_client(config: dict):
+    """创建并测试客户端连接"""
+    ctype = config.get("type", "").lower()
+    try:
+        if ctype == "qbittorrent":
+            import qbittorrentapi
+
+            client = qbittorrentapi.Client(
+                host=config["host"], port=config["port"],
+                username=config["username"], password=config["password"],
+                REQUESTS_ARGS={'timeout': (5, 15)} # (连接超时, 读取超时)
+            )
+            client.auth_log_in()
+            return client
+        elif ctype == "transmission":
+            import transmission_rpc
+
+            return transmission_rpc.Client(
+                host=config["host"], port=config["port"],
+                username=config["username"], password=config["password"],
+                timeout=15
+            )
+    except Exception as e:
+        logger.error(f"[客户端] {config['name']} 连接失败: {e}")
+    return None
+
+
+def get_client(config: dict):
+    """获取可复用的客户端，不存在或连接配置已变化时新建"""
+    name = config.get("name", "Unknown")
+    fingerprint = _fingerprint(config)
+
+    with _lock:
+        entry = _clients.get(name)
+        if entry and entry[0] == fingerprint:
+            return entry[1]
+
+    if entry:
+        logger.info(f"[客户端] {name} 连接配置已变化，重新建立连接")
+    client = create_client(config)
+    if client is None:
+        return None
+
+    with _lock:
+        _clients[name] = (fingerprint, client)
+    return client
+
+
+def invalidate(name: str) -> None:
+    """请求失败后丢弃客户端，下次使用时重新连接"""
+    with _lock:
+        _clients.pop(name, None)
+
+
+def prune(active_names: Iterable[str]) -> None:
+    """丢弃已从配置中移除的服务的客户端"""
+    active = set(active_names)
+    with _lock:
+        for name in [n for n in _clients if n not in active]:
+            logger.info(f"[客户端] {name} 已从配置中移除，释放连接")
+            del _clients[name]
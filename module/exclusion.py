@@ -0,0 +1,122 @@
+"""
+排除规则匹配
+
+excluded_paths 中的每一项按形式分为三类，构建时一次性编译：
+- 完整路径（不含通配符）："/data/important" —— 前缀树，排除该路径及其下所有内容
+- 名称（不含路径分隔符）："@eaDir"、".recycle"、"*.!qB" —— 任意一级目录名或文件名匹配即排除
+- 路径通配："/data/*/Extras"、"/data/**/Sample" —— 排除匹配的路径及其下所有内容；
+  * 与 ? 不跨越分隔符，** 可跨越任意多级（包括零级）
+
+所有名称规则合并为一个正则，所有路径通配合并为另一个正则，
+判断一个目录的开销与路径深度相关，与规则数量基本无关
+"""
+
+import os
+import re
+from typing import Iterable, List, Optional, Pattern, Set
+
+from module.seeded_index import SeededPathIndex
+
+_GLOB_CHARS = "*?["
+_SEP = re.escape(os.sep)
+# Windows 盘符根目录规范化后为 "T:"，不含分隔符但仍是完整路径
+_DRIVE = re.compile(r"^[A-Za-z]:$")
+
+
+def _translate(pattern: str) -> str:
+    """将通配符转换为正则（不含锚点）"""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**" + os.sep, i):
+                out.append(f"(?:.*{_SEP})?")
+                i += 3
+                continue
+            if pattern.startswith("**", i):
+                out.append(".*")
+                i += 2
+                continue
+            out.append(f"[^{_SEP}]*")
+        elif c == "?":
+            out.append(f"[^{_SEP}]")
+        elif c == "[":
+            j = i + 1
+            if j < n and pattern[j] in "!^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            j = pattern.find("]", j)
+            if j < 0:
+                out.append(re.escape(c))
+            else:
+                stuff = pattern[i + 1:j].replace("\\", "\\\\")
+                if stuff.startswith("!"):
+                    stuff = "^" + stuff[1:]
+                out.append(f"[{stuff}]")
+                i = j + 1
+                continue
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def _compile(patterns: List[str], suffix: str) -> Optional[Pattern]:
+    if not patterns:
+        return None
+    return re.compile("(?:" + "|".join(f"(?:{_translate(p)})" for p in patterns) + ")" + suffix)
+
+
+class ExclusionMatcher:
+    """编译后的排除规则，patterns 需已规范化（normalize_path）"""
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self._literal = SeededPathIndex()
+        self._literal_paths: Set[str] = set()
+        names: List[str] = []
+        globs: List[str] = []
+        for pattern in patterns:
+            if not pattern:
+                continue
+            if os.sep not in pattern and not _DRIVE.match(pattern):
+                names.append(pattern)
+            elif any(c in pattern for c in _GLOB_CHARS):
+                globs.append(pattern)
+            else:
+                self._literal.add(pattern)
+                self._literal_paths.add(pattern)
+        self._count = len(self._literal) + len(names) + len(globs)
+        # 名称规则对单个路径分量整体匹配；判断整条路径时用一次 search 检查所有分量
+        self._names = _compile(names, r"\Z")
+        self._names_in_path = None if not names else re.compile(
+            rf"(?:^|{_SEP})(?:" + "|".join(f"(?:{_translate(p)})" for p in names) + rf")(?={_SEP}|\Z)"
+        )
+        # 路径通配匹配路径本身或其任意上级目录：匹配到分量边界即可
+        self._globs = _compile(globs, rf"(?:{_SEP}|\Z)")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def contains(self, path: str) -> bool:
+        """路径本身或其任意上级目录是否被排除"""
+        if self._literal.contains(path):
+            return True
+        if self._globs is not None and self._globs.match(path):
+            return True
+        if self._names_in_path is not None and self._names_in_path.search(path):
+            return True
+        return False
+
+    __contains__ = contains
+
+    def excludes_file(self, path: str, name: str) -> bool:
+        """
+        扫描时判断单个文件：所在目录已检查过，只需比对文件名、路径通配与完整路径本身
+        """
+        if self._names is not None and self._names.match(name):
+            return True
+        if self._globs is not None and self._globs.match(path):
+            return True
+        return path in self._literal_paths
@@ -7,94 +7,121 @@
 
 import os
 import platform
+from itertools import chain
 from pathlib import Path
-from typing import List, Set, Dict, Tuple, Optional
+from typing import Callable, Iterator, List, Mapping, Set, Dict, Tuple, Optional, Union
 from tools import logs
 from module.unseeded import (
-    create_client, 
-    get_torrents_data, 
     normalize_path,
-    IS_WINDOWS
+    IS_WINDOWS,
+    PathMapper
 )
+from module.inventory import DEFAULT_FETCH_TIMEOUT, DEFAULT_FETCH_WORKERS, iter_inventories
+from module.exclusion import ExclusionMatcher
+from module.seeded_index import CompactPathIndex
+from module import metrics
+from module.scanner import FileRecord, ScanStats
+from module.scan_cache import ScanCache
+from module.scan_scheduler import ScanScheduler
 
 logger = logs.logs_configuration()
 
+# 全局模式在通知与指标中使用的服务名称
+GLOBAL_SERVICE_NAME = "GlobalScan"
 
-def aggregate_seeded_files(services: List[Dict]) -> Tuple[Set[str], List[str]]:
+
+def aggregate_seeded_files(
+    services: List[Dict],
+    fetch_workers: int = DEFAULT_FETCH_WORKERS,
+    fetch_timeout: float = DEFAULT_FETCH_TIMEOUT,
+    path_mappers: Optional[Mapping[str, PathMapper]] = None,
+    stale_services: Optional[List[str]] = None,
+    rechecks: Optional[List[Callable[[str], bool]]] = None
+) -> Tuple[CompactPathIndex, List[str]]:
     """
     聚合所有下载器的做种文件列表
     
+    各下载器并发获取，结果按完成顺序收集，总耗时取决于最慢的下载器；
+    全部完成后一次性构建紧凑索引，不再合并出一份完整的路径集合
+    
     Args:
         services: 所有下载器配置列表
+        fetch_workers: 并发获取的最大线程数
+        fetch_timeout: 单个下载器的获取时限（秒）
+        path_mappers: 运行计划中编译好的路径映射（可选）
+        stale_services: 传入列表时追加使用快照数据（ServiceInventory.stale）的下载器名称
+        rechecks: 传入列表时追加精确模式下复核候选文件的函数（ServiceInventory.recheck）
     
     Returns:
-        (所有做种文件的集合, 错误消息列表)
+        (所有做种内容的紧凑索引, 错误消息列表)
     """
-    all_seeded_files = set()
+    content_sets = []
     error_messages = []
     
     logger.info(f"[全局扫描] 开始聚合 {len(services)} 个下载器的做种文件")
     
-    for service in services:
+    for service, inventory in iter_inventories(services, fetch_workers, fetch_timeout, path_mappers):
         name = service.get('name', 'Unknown')
-        client_type = service.get('type', '')
         
-        try:
-            # 创建客户端连接
-            client = create_client(service)
-            if not client:
-                error_messages.append(f"无法连接到 {name}")
-                continue
-            
-            # 获取该下载器的种子数据
-            save_paths, content_paths, err = get_torrents_data(
-                client, client_type, service.get("path_mapping", [])
-            )
-            
-            if err:
-                error_messages.append(f"{name}: {err}")
-                continue
-            
-            # 添加到全局集合
-            all_seeded_files.update(content_paths)
-            logger.info(f"[全局扫描] {name}: 找到 {len(content_paths)} 个做种文件")
-            
-        except Exception as e:
-            error_msg = f"{name} 处理失败: {str(e)}"
-            logger.error(f"[全局扫描] {error_msg}")
-            error_messages.append(error_msg)
-    
-    logger.info(f"[全局扫描] 聚合完成，共 {len(all_seeded_files)} 个做种文件")
-    return all_seeded_files, error_messages
+        if inventory.error:
+            logger.error(f"[全局扫描] {inventory.error}")
+            error_messages.append(inventory.error)
+            continue
+        
+        content_sets.append(inventory.content_paths)
+        if inventory.stale and stale_services is not None:
+            stale_services.append(name)
+        if inventory.recheck is not None and rechecks is not None:
+            rechecks.append(inventory.recheck)
+        logger.info(
+            f"[全局扫描] {name}: 找到 {len(inventory.content_paths)} 个做种文件"
+            + ("（快照数据）" if inventory.stale else "")
+        )
+    
+    with metrics.timed("index_build", service=GLOBAL_SERVICE_NAME):
+        seeded_index = CompactPathIndex(chain.from_iterable(content_sets), normalize_path)
+    logger.info(f"[全局扫描] 聚合完成，去除嵌套后共 {len(seeded_index)} 项做种内容")
+    return seeded_index, error_messages
 
 
-def scan_directory_global(
+def iter_directory_global(
     scan_paths: List[str],
-    all_seeded_files: Set[str],
+    all_seeded_files: Union[CompactPathIndex, Set[str]],
     min_size_mb: int,
-    excluded_paths: Set[str]
-) -> List[str]:
+    excluded_paths: Union[ExclusionMatcher, Set[str]],
+    cache: Optional[ScanCache] = None,
+    scheduler: Optional[ScanScheduler] = None
+) -> Iterator[FileRecord]:
     """
-    全局扫描指定目录，找出未在任何下载器中做种的文件
+    全局扫描指定目录，逐个产出未在任何下载器中做种的文件
     
     Args:
         scan_paths: 要扫描的目录列表
-        all_seeded_files: 所有下载器的做种文件集合
+        all_seeded_files: aggregate_seeded_files 构建的做种索引，或做种文件路径集合
         min_size_mb: 最小文件大小（MB）
-        excluded_paths: 排除路径集合
+        excluded_paths: 排除规则集合，或运行计划中编译好的 ExclusionMatcher
+        cache: 增量扫描缓存（可选）
+        scheduler: 并行扫描调度器（可选，默认顺序扫描）
     
-    Returns:
-        未做种文件列表
+    Yields:
+        未做种文件的 FileRecord
     """
-    unseeded_files = []
+    found = 0
     min_size_bytes = min_size_mb * 1024 * 1024
     
-    # 预处理：规范化做种文件路径和排除路径
-    norm_seeded = {normalize_path(p) for p in all_seeded_files}
-    norm_excluded = [normalize_path(p) for p in excluded_paths]
+    # 预处理：做种索引通常已在聚合时构建，排除规则通常已在运行计划中编译
+    excluded_index = excluded_paths if isinstance(excluded_paths, ExclusionMatcher) else ExclusionMatcher(
+        normalize_path(p) for p in excluded_paths
+    )
+    if isinstance(all_seeded_files, CompactPathIndex):
+        seeded_index = all_seeded_files
+    else:
+        with metrics.timed("index_build", service=GLOBAL_SERVICE_NAME):
+            seeded_index = CompactPathIndex(all_seeded_files, normalize_path)
     
     logger.info(f"[全局扫描] 开始扫描 {len(scan_paths)} 个目录")
     
+    roots = []
     for scan_path in scan_paths:
         scan_path_norm = normalize_path(scan_path)
         
@@ -103,68 +130,83 @@ def scan_directory_global(
             continue
         
         logger.info(f"[全局扫描] 正在扫描: {scan_path_norm}")
-        file_count = 0
-        
-        for root, dirs, files in os.walk(scan_path_norm):
-            curr_root = normalize_path(root)
-            
-            # 检查是否在排除路径中
-            if any(curr_root.startswith(ex) for ex in norm_excluded):
-                dirs[:] = []  # 停止遍历子目录
-                continue
-            
-            for file in files:
-                file_path = os.path.join(root, file)
-                full_path = normalize_path(file_path)
-                
-                try:
-                    # 检查文件大小
-                    f_size = os.path.getsize(full_path)
-                    if f_size < min_size_bytes:
-                        continue
-                    
-                    file_count += 1
-                    
-                    # 核心逻辑：检查文件是否在任何下载器的做种列表中
-                    is_seeded = False
-                    for seeded_path in norm_seeded:
-                        # 检查文件是否属于某个做种内容
-                        # 1. 文件本身是做种文件
-                        # 2. 文件在某个做种目录下
-                        if full_path == seeded_path or full_path.startswith(seeded_path + os.sep):
-                            is_seeded = True
-                            break
-                    
-                    if not is_seeded:
-                        unseeded_files.append(full_path)
-                        
-                except OSError as e:
-                    logger.debug(f"[全局扫描] 无法访问文件: {full_path} - {e}")
-                    continue
-        
-        logger.info(f"[全局扫描] {scan_path_norm}: 检查了 {file_count} 个文件")
+        roots.append(scan_path_norm)
+    
+    # 核心逻辑：检查文件是否在任何下载器的做种列表中
+    # 1. 文件本身是做种文件
+    # 2. 文件在某个做种目录下（整个目录直接跳过）
+    # 多个扫描目录及其子目录由调度器并行遍历（scan_workers > 1 时）
+    stats_by_root: Dict[str, ScanStats] = {}
+    records = metrics.TimedIterator((scheduler or ScanScheduler()).scan(
+        roots, seeded_index, excluded_index, min_size_bytes, stats_by_root, cache, seeded_index
+    ))
+    for record in records:
+        found += 1
+        yield record
     
-    logger.info(f"[全局扫描] 扫描完成，找到 {len(unseeded_files)} 个未做种文件")
-    return unseeded_files
+    total = ScanStats()
+    for root in roots:
+        stats = stats_by_root[root]
+        total.merge(stats)
+        logger.info(
+            f"[全局扫描] {root}: 检查了 {stats.files} 个文件，"
+            f"跳过做种目录 {stats.pruned_seeded} 个"
+            + (f"，无法访问 {stats.errors} 项" if stats.errors else "")
+        )
+    metrics.observe_stage("walk", records.elapsed, service=GLOBAL_SERVICE_NAME)
+    metrics.record_scan(total, GLOBAL_SERVICE_NAME)
+    
+    logger.info(f"[全局扫描] 扫描完成，找到 {found} 个未做种文件")
 
 
-def find_unseeded_files_global(
+def scan_directory_global(
+    scan_paths: List[str],
+    all_seeded_files: Union[CompactPathIndex, Set[str]],
+    min_size_mb: int,
+    excluded_paths: Union[ExclusionMatcher, Set[str]],
+    cache: Optional[ScanCache] = None,
+    scheduler: Optional[ScanScheduler] = None
+) -> List[str]:
+    """全局扫描指定目录，返回未做种文件路径列表（参数同 iter_directory_global）"""
+    return [
+        record.path for record in iter_directory_global(
+            scan_paths, all_seeded_files, min_size_mb, excluded_paths, cache, scheduler
+        )
+    ]
+
+
+def stream_unseeded_files_global(
     services: List[Dict],
     scan_paths: List[str],
     check_file_size: int,
-    excluded_paths: Set[str]
-) -> Tuple[List[str], List[str]]:
+    excluded_paths: Union[ExclusionMatcher, Set[str]],
+    cache: Optional[ScanCache] = None,
+    fetch_workers: int = DEFAULT_FETCH_WORKERS,
+    fetch_timeout: float = DEFAULT_FETCH_TIMEOUT,
+    scheduler: Optional[ScanScheduler] = None,
+    path_mappers: Optional[Mapping[str, PathMapper]] = None,
+    stale_services: Optional[List[str]] = None
+) -> Tuple[Iterator[FileRecord], List[str]]:
     """
-    全局扫描模式入口函数
+    全局扫描模式入口函数（流式）
+    
+    先聚合所有下载器的做种文件，再返回一个惰性的目录扫描生成器，
+    调用方可以边扫描边删除/报告，无需等待完整列表
     
     Args:
         services: 所有下载器配置列表
         scan_paths: 要扫描的目录列表
         check_file_size: 文件大小阈值（MB）
-        excluded_paths: 排除路径集合
+        excluded_paths: 排除规则集合，或运行计划中编译好的 ExclusionMatcher
+        cache: 增量扫描缓存（可选）
+        fetch_workers: 并发获取种子数据的最大线程数
+        fetch_timeout: 单个下载器的获取时限（秒）
+        scheduler: 并行扫描调度器（可选，默认顺序扫描）
+        path_mappers: 运行计划中编译好的路径映射（下载器名称 -> PathMapper，可选）
+        stale_services: 传入列表时追加使用快照数据的下载器名称，调用方据此只报告不删除
     
     Returns:
-        (未做种文件列表, 错误消息列表)
+        (未做种文件生成器, 错误消息列表)
     """
     logger.info("=" * 60)
     logger.info("[全局扫描模式] 开始执行")
@@ -173,19 +215,52 @@ def find_unseeded_files_global(
     logger.info("=" * 60)
     
     # 步骤1: 聚合所有下载器的做种文件
-    all_seeded_files, error_messages = aggregate_seeded_files(services)
+    rechecks = []
+    all_seeded_files, error_messages = aggregate_seeded_files(
+        services, fetch_workers, fetch_timeout, path_mappers, stale_services, rechecks
+    )
     
     if not all_seeded_files:
         logger.warning("[全局扫描] 未找到任何做种文件，可能所有下载器都无连接或无种子")
-        return [], error_messages
+        return iter(()), error_messages
     
     # 步骤2: 扫描指定目录
-    unseeded_files = scan_directory_global(
+    records = iter_directory_global(
         scan_paths=scan_paths,
         all_seeded_files=all_seeded_files,
         min_size_mb=check_file_size,
-        excluded_paths=excluded_paths
+        excluded_paths=excluded_paths,
+        cache=cache,
+        scheduler=scheduler
+    )
+    if rechecks:
+        # 精确模式：缓存的文件列表可能已过时，候选文件按最新文件列表复核
+        records = (record for record in records if not any(recheck(record.path) for recheck in rechecks))
+    return records, error_messages
+
+
+def find_unseeded_files_global(
+    services: List[Dict],
+    scan_paths: List[str],
+    check_file_size: int,
+    excluded_paths: Union[ExclusionMatcher, Set[str]],
+    cache: Optional[ScanCache] = None,
+    fetch_workers: int = DEFAULT_FETCH_WORKERS,
+    fetch_timeout: float = DEFAULT_FETCH_TIMEOUT,
+    scheduler: Optional[ScanScheduler] = None,
+    path_mappers: Optional[Mapping[str, PathMapper]] = None
+) -> Tuple[List[str], List[str]]:
+    """
+    全局扫描模式入口函数（参数同 stream_unseeded_files_global）
+    
+    Returns:
+        (未做种文件列表, 错误消息列表)
+    """
+    records, error_messages = stream_unseeded_files_global(
+        services, scan_paths, check_file_size, excluded_paths, cache, fetch_workers, fetch_timeout, scheduler,
+        path_mappers
     )
+    unseeded_files = [record.path for record in records]
     
     logger.info("=" * 60)
     logger.info(f"[全局扫描模式] 完成，未做种文件: {len(unseeded_files)}")
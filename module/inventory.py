@@ -0,0 +1,119 @@
+"""
+下载器种子数据并发获取
+
+每个下载器的连接与 get_torrents_data 在有界线程池中并发执行，
+结果按完成顺序返回；单个下载器超过时限即视为失败，不再拖慢整轮任务。
+启用快照时，获取成功的数据写入快照，失败或超时的下载器改用不超过时限的快照（标记为 stale）
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+from tools import logs
+from module import inventory_snapshot, metrics
+from module.unseeded import PathMapper, ServiceInventory, fetch_inventory
+
+logger = logs.logs_configuration()
+
+DEFAULT_FETCH_WORKERS = 8
+DEFAULT_FETCH_TIMEOUT = 120  # 秒
+
+
+def fetch_options(config: dict) -> Dict[str, float]:
+    """从配置中读取并发获取参数"""
+    return {
+        "max_workers": int(config.get('fetch_workers', DEFAULT_FETCH_WORKERS)),
+        "timeout": float(config.get('fetch_timeout', DEFAULT_FETCH_TIMEOUT)),
+    }
+
+
+def iter_inventories(
+    services: List[Dict],
+    max_workers: int = DEFAULT_FETCH_WORKERS,
+    timeout: float = DEFAULT_FETCH_TIMEOUT,
+    path_mappers: Optional[Mapping[str, PathMapper]] = None,
+) -> Iterator[Tuple[Dict, ServiceInventory]]:
+    """
+    并发获取所有下载器的种子数据，按完成顺序产出 (下载器配置, 种子数据)
+
+    Args:
+        services: 下载器配置列表
+        max_workers: 最大并发数
+        timeout: 单个下载器的时限（秒），从该下载器实际开始获取时计时
+        path_mappers: 运行计划中编译好的路径映射（下载器名称 -> PathMapper），缺少的下载器现场编译
+    """
+    if not services:
+        return
+
+    started: Dict[int, float] = {}
+    snapshots = inventory_snapshot.active()
+
+    def run(index: int, service: Dict) -> ServiceInventory:
+        started[index] = time.monotonic()
+        mapper = path_mappers.get(service.get('name', 'Unknown')) if path_mappers else None
+        result = fetch_inventory(service, mapper)
+        metrics.record_inventory(
+            service.get('name', 'Unknown'), len(result.save_paths), len(result.content_paths), result.error
+        )
+        if snapshots is not None:
+            if result.error is None:
+                inventory_snapshot.record_live(snapshots, service, result)
+            else:
+                result = inventory_snapshot.fallback(snapshots, service, result.error) or result
+        return result
+
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(max_workers, len(services))),
+        thread_name_prefix="inventory",
+    )
+    pending: Dict[Future, int] = {}
+    startup = []
+    fast_startup = snapshots is not None and inventory_snapshot.claim_startup(snapshots)
+    for index, service in enumerate(services):
+        future = executor.submit(run, index, service)
+        snapshot = inventory_snapshot.startup_snapshot(snapshots, service) if fast_startup else None
+        if snapshot is None:
+            pending[future] = index
+        else:
+            # 启动时直接使用快照，实时获取在后台继续执行并刷新快照
+            startup.append((service, snapshot))
+
+    try:
+        yield from startup
+        while pending:
+            # 等待到最早一个正在运行的任务超时为止
+            now = time.monotonic()
+            deadlines = [started[i] + timeout for i in pending.values() if i in started]
+            wait_for = max(0.0, min(deadlines) - now) if deadlines else timeout
+            wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            # 消费方处理上一个结果（普通模式下即扫描该下载器）期间完成的任务一并收集
+            for future in [f for f in pending if f.done()]:
+                service = services[pending.pop(future)]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = ServiceInventory(set(), set(), f"{service.get('name', 'Unknown')} 处理失败: {e}")
+                yield service, result
+
+            # 超时的任务直接放弃，工作线程会在客户端自身的超时后自行结束；
+            # 在上面产出结果期间刚好完成的任务留到下一次循环收集，不算超时
+            now = time.monotonic()
+            for future, index in list(pending.items()):
+                if future.done():
+                    continue
+                if index in started and now - started[index] >= timeout:
+                    del pending[future]
+                    service = services[index]
+                    name = service.get('name', 'Unknown')
+                    logger.error(f"[获取种子] {name} 超过 {timeout:.0f} 秒未完成，本轮跳过")
+                    metrics.inc("service_fetch_timeouts_total", "获取种子数据超时次数", service=name)
+                    error = f"{name} 获取种子数据超时 ({timeout:.0f}s)"
+                    fallback = inventory_snapshot.fallback(snapshots, service, error) if snapshots is not None else None
+                    yield service, fallback or ServiceInventory(set(), set(), error)
+    finally:
+        # 消费方提前结束时取消尚未开始的获取；使用启动快照的下载器仍在后台获取并刷新快照
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
@@ -0,0 +1,205 @@
+"""
+下载器种子数据快照
+
+每个下载器最近一次成功获取的种子数据（保存路径与内容路径）压缩后保存在 SQLite 中，按服务名称索引：
+- 下载器暂时无法连接或超时时，改用不超过 max_age_hours 的快照，
+  全局模式下它的做种文件不会因此被当作未做种文件
+- fast_startup 启用时，进程启动后的第一轮直接使用快照开始扫描，实时数据在后台获取并刷新快照；
+  之后的每一轮都实时获取，失败时才改用快照
+
+快照返回的 ServiceInventory 标记为 stale：下载器停机期间新增的种子不在其中，
+凡是用到快照数据的扫描（普通模式的该下载器、全局模式与实时监控的整批判断）都只报告不删除。
+快照默认关闭，需在配置中启用；记录了生成时的路径映射等配置指纹，配置变化后旧快照不再使用
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+
+from tools import logs
+from module import metrics
+from module.unseeded import ServiceInventory
+
+logger = logs.logs_configuration()
+
+DEFAULT_MAX_AGE_HOURS = 24
+
+# 路径中不会出现 \0，用作分隔符
+_SEPARATOR = b"\0"
+
+
+def _fingerprint(service: Dict) -> str:
+    """影响路径计算结果的配置项，任一变化都会使快照失效"""
+    return repr((
+        service.get('type', '').lower(), service.get('host'), service.get('port'),
+        service.get('path_mapping', []), bool(service.get('precise_mode', False)),
+    ))
+
+
+def _pack(paths: Set[str]) -> bytes:
+    return zlib.compress(
+        _SEPARATOR.join(path.encode("utf-8", "surrogateescape") for path in sorted(paths))
+    )
+
+
+def _unpack(blob: bytes) -> Set[str]:
+    data = zlib.decompress(blob)
+    if not data:
+        return set()
+    return {part.decode("utf-8", "surrogateescape") for part in data.split(_SEPARATOR)}
+
+
+class InventorySnapshotStore:
+    """按服务名称保存的种子数据快照（多线程访问）"""
+
+    def __init__(self, db_path: str):
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " service TEXT PRIMARY KEY, fingerprint TEXT, fetched_at REAL, save_paths BLOB, content_paths BLOB)"
+        )
+        self._conn.commit()
+
+    def save(self, service: Dict, inventory: ServiceInventory) -> None:
+        row = (
+            service.get('name', 'Unknown'), _fingerprint(service), time.time(),
+            _pack(inventory.save_paths), _pack(inventory.content_paths),
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (service, fingerprint, fetched_at, save_paths, content_paths)"
+                " VALUES (?, ?, ?, ?, ?)", row
+            )
+            self._conn.commit()
+
+    def load(self, service: Dict) -> Optional[Tuple[ServiceInventory, float]]:
+        """返回 (快照中的种子数据, 生成时间)，不存在或配置已变化时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, fetched_at, save_paths, content_paths FROM snapshots WHERE service = ?",
+                (service.get('name', 'Unknown'),)
+            ).fetchone()
+        if row is None or row[0] != _fingerprint(service):
+            return None
+        _, fetched_at, save_paths, content_paths = row
+        try:
+            return ServiceInventory(_unpack(save_paths), _unpack(content_paths), None, stale=True), fetched_at
+        except (zlib.error, UnicodeDecodeError) as e:
+            logger.warning(f"[快照] {service.get('name', 'Unknown')} 的快照已损坏，忽略: {e}")
+            return None
+
+
+class SnapshotPolicy(NamedTuple):
+    """快照配置"""
+    store: InventorySnapshotStore
+    max_age: float          # 秒
+    fast_startup: bool
+
+
+_policy: Optional[SnapshotPolicy] = None
+_stores: Dict[str, InventorySnapshotStore] = {}
+_lock = threading.Lock()
+
+# fast_startup 只作用于进程启动后的第一轮获取，由 claim_startup 领取
+_startup_pending = True
+
+
+def configure(config: dict) -> Optional[SnapshotPolicy]:
+    """按配置启用或关闭快照，配置变化时调用"""
+    global _policy
+    snapshot_config = config.get('inventory_snapshot') or {}
+    if not snapshot_config.get('enabled', False):
+        with _lock:
+            _policy = None
+        return None
+
+    db_path = snapshot_config.get('path') or os.path.join(logs.log_dir(), "inventory_snapshots.db")
+    with _lock:
+        store = _stores.get(db_path)
+        if store is None:
+            try:
+                store = InventorySnapshotStore(db_path)
+            except (sqlite3.Error, OSError) as e:
+                logger.error(f"[快照] 无法打开快照文件 {db_path}，本次不使用快照: {e}")
+                _policy = None
+                return None
+            _stores[db_path] = store
+        _policy = SnapshotPolicy(
+            store,
+            float(snapshot_config.get('max_age_hours', DEFAULT_MAX_AGE_HOURS)) * 3600,
+            bool(snapshot_config.get('fast_startup', False)),
+        )
+        return _policy
+
+
+def active() -> Optional[SnapshotPolicy]:
+    return _policy
+
+
+def record_live(policy: SnapshotPolicy, service: Dict, inventory: ServiceInventory) -> None:
+    """实时获取成功后刷新快照"""
+    name = service.get('name', 'Unknown')
+    try:
+        policy.store.save(service, inventory)
+    except sqlite3.Error as e:
+        logger.warning(f"[快照] 保存 {name} 的快照失败: {e}")
+
+
+def _fresh(policy: SnapshotPolicy, service: Dict) -> Optional[Tuple[ServiceInventory, float]]:
+    try:
+        loaded = policy.store.load(service)
+    except sqlite3.Error as e:
+        logger.warning(f"[快照] 读取 {service.get('name', 'Unknown')} 的快照失败: {e}")
+        return None
+    if loaded is None:
+        return None
+    age = time.time() - loaded[1]
+    if age > policy.max_age:
+        return None
+    return loaded[0], age
+
+
+def claim_startup(policy: SnapshotPolicy) -> bool:
+    """启用 fast_startup 且本进程尚未开始过任何一轮获取时返回 True，只返回一次"""
+    global _startup_pending
+    with _lock:
+        claimed = _startup_pending and policy.fast_startup
+        _startup_pending = False
+    return claimed
+
+
+def skip_startup() -> None:
+    """不使用 fast_startup（一次性运行只有一轮，使用快照就只能报告、永远不会自动删除）"""
+    global _startup_pending
+    with _lock:
+        _startup_pending = False
+
+
+def startup_snapshot(policy: SnapshotPolicy, service: Dict) -> Optional[ServiceInventory]:
+    """fast_startup 的第一轮（调用方已通过 claim_startup 领取）：返回可用的快照"""
+    name = service.get('name', 'Unknown')
+    loaded = _fresh(policy, service)
+    if loaded is None:
+        return None
+    inventory, age = loaded
+    logger.info(f"[快照] {name}: 启动时使用 {age / 60:.0f} 分钟前的快照，实时数据在后台获取")
+    return inventory
+
+
+def fallback(policy: SnapshotPolicy, service: Dict, error: str) -> Optional[ServiceInventory]:
+    """获取失败时改用不超过时限的快照，没有可用快照返回 None"""
+    name = service.get('name', 'Unknown')
+    loaded = _fresh(policy, service)
+    if loaded is None:
+        return None
+    inventory, age = loaded
+    logger.warning(f"[快照] {name} 获取失败（{error}），改用 {age / 60:.0f} 分钟前的快照")
+    metrics.inc("inventory_snapshot_fallbacks_total", "下载器不可用时改用快照的次数", service=name)
+    return inventory
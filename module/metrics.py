@@ -0,0 +1,217 @@
+"""
+Prometheus 指标
+
+进程内的简单指标注册表（只依赖标准库），按 Prometheus 文本格式输出：
+- 各阶段耗时：fetch（每个下载器获取种子数据）、index_build（构建做种索引）、
+  walk（目录遍历，逐个文件的做种匹配在遍历中进行，也计入该阶段）、
+  delete（删除/统计扫描结果）、notify（发送通知）
+- 扫描与清理计数：检查的文件数/字节数、未做种候选、删除结果
+- 下载器种子数据规模与最后一次成功获取的时间
+
+指标始终在内存中累计（开销只是几次字典操作），配置 metrics.enabled 后才启动 HTTP 服务：
+    curl http://127.0.0.1:9108/metrics
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+from tools import logs
+
+logger = logs.logs_configuration()
+
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 9108
+
+_PREFIX = "void_"
+
+T = TypeVar("T")
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Metric:
+    """单个指标族：{标签: 数值}"""
+
+    def __init__(self, name: str, help_text: str, metric_type: str):
+        self.name = _PREFIX + name
+        self.help = help_text
+        self.type = metric_type
+        self.values: Dict[Labels, float] = {}
+
+
+_metrics: Dict[str, _Metric] = {}
+_lock = threading.Lock()
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _metric(name: str, help_text: str, metric_type: str) -> _Metric:
+    metric = _metrics.get(name)
+    if metric is None:
+        metric = _metrics[name] = _Metric(name, help_text, metric_type)
+    return metric
+
+
+def inc(name: str, help_text: str, value: float = 1, **labels) -> None:
+    """计数器累加"""
+    key = _labels(labels)
+    with _lock:
+        metric = _metric(name, help_text, "counter")
+        metric.values[key] = metric.values.get(key, 0) + value
+
+
+def set_gauge(name: str, help_text: str, value: float, **labels) -> None:
+    """设置瞬时值"""
+    with _lock:
+        _metric(name, help_text, "gauge").values[_labels(labels)] = value
+
+
+def observe_stage(stage: str, seconds: float, **labels) -> None:
+    """记录一次阶段耗时：最近一次耗时 + 累计耗时/次数（可用 rate 求平均）"""
+    set_gauge("stage_last_duration_seconds", "最近一次阶段耗时", seconds, stage=stage, **labels)
+    inc("stage_duration_seconds_total", "阶段累计耗时", seconds, stage=stage, **labels)
+    inc("stage_runs_total", "阶段执行次数", 1, stage=stage, **labels)
+
+
+@contextmanager
+def timed(stage: str, **labels):
+    """统计 with 块的耗时"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start, **labels)
+
+
+class TimedIterator:
+    """包装生成器，只统计生成器内部（产出下一个元素）花费的时间，不含调用方处理的时间"""
+
+    def __init__(self, iterable: Iterable[T]):
+        self._iterator = iter(iterable)
+        self.elapsed = 0.0
+
+    def __iter__(self) -> "TimedIterator":
+        return self
+
+    def __next__(self) -> T:
+        start = time.perf_counter()
+        try:
+            return next(self._iterator)
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+
+def record_inventory(service: str, save_paths: int, content_paths: int, error: Optional[str]) -> None:
+    """记录单个下载器的种子数据获取结果"""
+    if error:
+        inc("service_fetch_errors_total", "获取种子数据失败次数", service=service)
+        return
+    set_gauge("inventory_save_paths", "下载器保存路径数量", save_paths, service=service)
+    set_gauge("inventory_content_paths", "下载器做种内容路径数量", content_paths, service=service)
+    set_gauge("service_last_success_timestamp_seconds", "最后一次成功获取种子数据的时间", time.time(), service=service)
+
+
+def record_scan(stats, service: str) -> None:
+    """记录一次目录遍历的计数（stats 为 scanner.ScanStats）"""
+    inc("scanned_dirs_total", "遍历的目录数", stats.dirs, service=service)
+    inc("scanned_files_total", "检查的文件数（达到大小阈值）", stats.files, service=service)
+    inc("scanned_bytes_total", "检查的文件总字节数", stats.bytes, service=service)
+    inc("scan_errors_total", "遍历时无法访问的目录/文件数", stats.errors, service=service)
+
+
+def record_cleanup(summary, auto_remove: bool, service: str) -> None:
+    """记录一次扫描结果处理（summary 为 cleanup.CleanupSummary）"""
+    if auto_remove:
+        inc("deleted_files_total", "已删除的文件数", summary.file_count, service=service)
+        inc("deleted_bytes_total", "已删除文件的总字节数", summary.total_bytes, service=service)
+        inc("freed_bytes_total", "实际释放的字节数", summary.freed_bytes, service=service)
+        inc("delete_failures_total", "删除失败的文件数", summary.failed, service=service)
+        inc("removed_dirs_total", "删除的空目录数", summary.removed_dirs, service=service)
+    set_gauge("last_candidates", "最近一轮发现的未做种文件数", summary.file_count, service=service)
+    set_gauge("last_candidate_bytes", "最近一轮未做种文件的可释放字节数", summary.freed_bytes, service=service)
+    inc("candidates_total", "累计发现的未做种文件数", summary.file_count, service=service)
+
+
+def value(name: str, **labels) -> Optional[float]:
+    """读取某个指标的当前值（基准测试等进程内使用），不存在时返回 None"""
+    with _lock:
+        metric = _metrics.get(name)
+        return metric.values.get(_labels(labels)) if metric else None
+
+
+def snapshot(name: str) -> Dict[Labels, float]:
+    """复制某个指标族的全部数值，用于计算一段时间内的增量"""
+    with _lock:
+        metric = _metrics.get(name)
+        return dict(metric.values) if metric else {}
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_sample(name: str, labels: Labels, sample: float) -> str:
+    label_str = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    number = str(int(sample)) if float(sample).is_integer() else repr(float(sample))
+    return f"{name}{{{label_str}}} {number}" if label_str else f"{name} {number}"
+
+
+def render() -> str:
+    """Prometheus 文本格式"""
+    lines: List[str] = []
+    with _lock:
+        for metric in _metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for labels, sample in metric.values.items():
+                lines.append(_format_sample(metric.name, labels, sample))
+    return "\n".join(lines) + "\n"
+
+
+def _handler_class():
+    """http.server 连带导入 email、http.client 等，只在启用指标服务时加载"""
+    from http.server import BaseHTTPRequestHandler
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # 抓取请求很频繁，不写入日志
+            pass
+
+    return _Handler
+
+
+def start_server(config: dict) -> Optional["ThreadingHTTPServer"]:
+    """根据配置启动指标 HTTP 服务，未启用或端口占用时返回 None"""
+    metrics_config = config.get('metrics') or {}
+    if not metrics_config.get('enabled', False):
+        return None
+    host = metrics_config.get('host', DEFAULT_HOST)
+    port = int(metrics_config.get('port', DEFAULT_PORT))
+    from http.server import ThreadingHTTPServer
+
+    try:
+        server = ThreadingHTTPServer((host, port), _handler_class())
+    except OSError as e:
+        logger.error(f"[指标] 无法监听 {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info(f"[指标] 已启动: http://{host}:{port}/metrics")
+    return server
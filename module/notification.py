@@ -1,21 +1,34 @@
-import smtplib
-import ssl
-import requests
+import queue
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from email.mime.text import MIMEText
-from email.header import Header
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from typing import List, NamedTuple, Optional
 
+# requests、smtplib、email 只在实际发送时于通知线程中导入，
+# 不发送通知的一次性运行（如 --once 且目录整洁）不承担这部分启动开销
 from tools import logs
+from module import metrics
 logger = logs.logs_configuration()
 
+# 报告中最多列出的文件数量，防止消息过长
+REPORT_FILE_LIMIT = 15
+
+# 退出时等待通知队列发送完毕的默认时限（秒）
+DEFAULT_DRAIN_TIMEOUT = 30
+
+# 企业微信 markdown_v2 内容上限为 4096 字节，合并后的报告超出时分条发送
+WECOM_MAX_BYTES = 4096
+
 # 全局共享 Session 以提高性能
 _http_session = None
 
 def get_http_session():
     global _http_session
     if _http_session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
         _http_session = requests.Session()
         retry_strategy = Retry(
             total=3,
@@ -61,6 +74,8 @@ def report(enable_auto_remove: bool, scanning_status: bool, error=None, deleted_
     else:
         info = deleted_info or {}
         files = info.get('deleted_files', [])
+        # 流式处理时 deleted_files 只是示例路径，总数由 file_count 给出
+        file_count = info.get('file_count', len(files))
         raw_size = info.get('total_size', 0)
         
         # 空间换算
@@ -71,17 +86,17 @@ def report(enable_auto_remove: bool, scanning_status: bool, error=None, deleted_
         file_label = "🗑️ 删除文件" if enable_auto_remove else "📂 待处理文件"
         
         # 限制文件列表长度，防止消息过长
-        display_files = files[:15]
+        display_files = files[:REPORT_FILE_LIMIT]
         file_list_str = "\n   - ".join(display_files) if display_files else "无"
-        if len(files) > 15:
-            file_list_str += f"\n   ... 等共 {len(files)} 个文件"
+        if file_count > len(display_files):
+            file_list_str += f"\n   ... 等共 {file_count} 个文件"
 
         lines.extend([
             f"📊 任务状态: {status_text}",
             f"🤖 自动模式: {mode_text}",
             f"{'-' * 34}",
             "📈 统计数据:",
-            f"   • 文件数量: {len(files)} 个",
+            f"   • 文件数量: {file_count} 个",
             f"   • 释放空间: {size_str}",
             "",
             f"{file_label}列表:",
@@ -91,8 +106,112 @@ def report(enable_auto_remove: bool, scanning_status: bool, error=None, deleted_
     lines.append(f"{'=' * 34}")
     return "\n".join(lines)
 
+class _Job(NamedTuple):
+    """通知队列中的一条待发送消息"""
+    notification_type: str
+    channel_config: dict
+    messages: List[str]     # 同一渠道的多份报告，发送时合并
+    label: str              # 指标中的 service 标签
+
+
+class _SmtpPool:
+    """
+    复用 SMTP 连接：同一批待发送的邮件共用一个已登录的连接，队列空闲时关闭。
+    只在通知工作线程中使用，无需加锁
+    """
+
+    def __init__(self):
+        self._key = None
+        self._server = None
+
+    def _connect(self, email_config: dict):
+        import smtplib
+
+        host = email_config["smtp_host"]
+        port = int(email_config["smtp_port"])
+        # 使用 SSL 连接判断
+        if port == 465:
+            server = smtplib.SMTP_SSL(host, port)
+        else:
+            server = smtplib.SMTP(host, port)
+            server.starttls()
+        server.login(email_config["username"], email_config["password"])
+        return server
+
+    def get(self, email_config: dict, fresh: bool = False):
+        key = (email_config["smtp_host"], int(email_config["smtp_port"]), email_config["username"])
+        if self._server is not None and (fresh or key != self._key):
+            self.close()
+        if self._server is None:
+            self._server = self._connect(email_config)
+            self._key = key
+        return self._server
+
+    def close(self) -> None:
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            pass
+        self._server = None
+        self._key = None
+
+
+class _Dispatcher:
+    """后台通知线程：扫描循环只负责入队，网络请求与重试不再阻塞下一个下载器的扫描"""
+
+    def __init__(self):
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._smtp = _SmtpPool()
+
+    def submit(self, job: _Job) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="notification", daemon=True)
+                self._thread.start()
+        self._queue.put(job)
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._smtp.close()
+                return
+            try:
+                with metrics.timed("notify", service=job.label):
+                    _deliver(job, self._smtp)
+            except Exception as e:
+                logger.error(f"[发送通知] 发送失败: {type(e).__name__}: {e}")
+            # 队列空闲时释放 SMTP 连接，避免长时间占用被服务器断开
+            if self._queue.empty():
+                self._smtp.close()
+
+    def shutdown(self, timeout: float) -> bool:
+        """等待已入队的通知发送完毕，超过时限返回 False"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None or not thread.is_alive():
+            return True
+        self._queue.put(None)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning(f"[发送通知] 退出前 {timeout:.0f} 秒内未能发送完毕，剩余 {self._queue.qsize()} 条通知被放弃")
+            return False
+        return True
+
+
+_dispatcher = _Dispatcher()
+
+# 每个线程各自的批量缓冲区：主循环一轮扫描内的报告合并发送，实时监控线程的通知不受影响
+_local = threading.local()
+
+
 def send_notification(services: dict, config: dict, scanning_status: bool, error=None, deleted_info: dict = None) -> None:
-    """分发通知的入口"""
+    """分发通知的入口：生成报告后入队，由后台线程发送，不阻塞调用方"""
     notification_type = config.get('notification_type', 'webhook').lower()
     services_name = services.get('name', '未知服务')
     
@@ -105,16 +224,82 @@ def send_notification(services: dict, config: dict, scanning_status: bool, error
         services_name=services_name
     )
 
+    pending = getattr(_local, 'pending', None)
+    if pending is not None:
+        # 批量模式：本轮结束时与其他下载器的报告合并为一条消息
+        pending.append((services_name, message))
+        return
+
     logger.info(f"[发送通知] 正在通过 {notification_type} 发送报告...")
+    _dispatcher.submit(_Job(notification_type, _channel_config(config, notification_type), [message], services_name))
+
+
+def _channel_config(config: dict, notification_type: str) -> dict:
+    return dict(config.get(notification_type) or {})
+
+
+@contextmanager
+def batch(config: dict):
+    """
+    合并当前线程一轮任务内的所有报告，退出时每个通知渠道只入队一条消息
+
+    用法:
+        with notification.batch(config):
+            ...  # 期间的 send_notification 只收集报告
+    """
+    if getattr(_local, 'pending', None) is not None:
+        # 已处于批量模式（嵌套调用），由外层统一发送
+        yield
+        return
+
+    _local.pending = []
+    try:
+        yield
+    finally:
+        pending, _local.pending = _local.pending, None
+        if pending:
+            notification_type = config.get('notification_type', 'webhook').lower()
+            names = [name for name, _ in pending]
+            label = names[0] if len(set(names)) == 1 else "batch"
+            logger.info(f"[发送通知] 正在通过 {notification_type} 发送 {len(pending)} 份报告...")
+            _dispatcher.submit(_Job(
+                notification_type, _channel_config(config, notification_type),
+                [message for _, message in pending], label
+            ))
+
+
+def shutdown(timeout: float = DEFAULT_DRAIN_TIMEOUT) -> bool:
+    """程序退出前调用：在时限内发送完队列中剩余的通知"""
+    return _dispatcher.shutdown(timeout)
 
-    if notification_type == "webhook":
-        _send_webhook(message, config.get('webhook', {}))
-    elif notification_type == "wecom":
-        _send_wecom_webhook(message, config.get('wecom', {}))
-    elif notification_type == "email":
-        _send_email(message, config.get('email', {}))
+
+def _deliver(job: _Job, smtp: _SmtpPool) -> None:
+    if job.notification_type == "webhook":
+        _send_webhook("\n\n".join(job.messages), job.channel_config)
+    elif job.notification_type == "wecom":
+        for chunk in _chunk_messages(
+            [_format_message_to_markdown(message) for message in job.messages], WECOM_MAX_BYTES
+        ):
+            _send_wecom_webhook(chunk, job.channel_config)
+    elif job.notification_type == "email":
+        _send_email("\n\n".join(job.messages), job.channel_config, smtp)
     else:
-        logger.error(f"[发送通知] 未知通知类型: {notification_type}")
+        logger.error(f"[发送通知] 未知通知类型: {job.notification_type}")
+
+
+def _chunk_messages(messages: List[str], max_bytes: int) -> List[str]:
+    """按报告边界把消息合并为若干条，每条不超过 max_bytes（单份报告超长时原样单独发送）"""
+    chunks, current, size = [], [], 0
+    for message in messages:
+        length = len(message.encode('utf-8'))
+        if current and size + 2 + length > max_bytes:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(message)
+        size += length + (2 if size else 0)
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
 
 def _send_webhook(message: str, webhook_config: dict) -> None:
     url = webhook_config.get('url')
@@ -186,19 +371,16 @@ def _format_message_to_markdown(message: str) -> str:
     
     return '\n'.join(markdown_lines)
 
-def _send_wecom_webhook(message: str, wecom_config: dict) -> None:
+def _send_wecom_webhook(markdown_content: str, wecom_config: dict) -> None:
     """
     发送企业微信 Webhook 通知
-    使用 markdown_v2 格式
+    使用 markdown_v2 格式，markdown_content 为已转换的 Markdown 文本
     """
     key = wecom_config.get('key')
     if not key:
         logger.error("[发送通知] 企业微信 Webhook key 未配置")
         return
 
-    # 将文本消息转换为 Markdown 格式
-    markdown_content = _format_message_to_markdown(message)
-    
     session = get_http_session()
     url = "https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key=" + key
     payload = {
@@ -224,37 +406,39 @@ def _send_wecom_webhook(message: str, wecom_config: dict) -> None:
     except Exception as e:
         logger.error(f"[发送通知] 企业微信 Webhook 失败: {str(e)}")
 
-def _send_email(message: str, email_config: dict) -> None:
+def _send_email(message: str, email_config: dict, smtp: _SmtpPool = None) -> None:
     """
     发送邮件通知
     :param message: 邮件内容
     :param email_config: 包含 smtp_host, smtp_port, username, password, to 的字典
+    :param smtp: 连接池，为空时本次单独建立连接
     """
     required_keys = ["smtp_host", "smtp_port", "username", "password", "to"]
     if not all(email_config.get(k) for k in required_keys):
         logger.error("[发送通知] 邮件配置不完整")
         return
 
+    import smtplib
+    from email.header import Header
+    from email.mime.text import MIMEText
+
     # 1. 准备邮件元数据
     msg = MIMEText(message, 'plain', 'utf-8')
     msg['Subject'] = Header('[📣] Void 通知', 'utf-8')
     msg['From'] = email_config["username"]
     msg['To'] = email_config["to"]
 
-    host = email_config["smtp_host"]
-    port = int(email_config["smtp_port"])
-        
+    pool = smtp or _SmtpPool()
     try:
-        # 使用 SSL 连接判断
-        if port == 465:
-            server = smtplib.SMTP_SSL(host, port)
-        else:
-            server = smtplib.SMTP(host, port)
-            server.starttls()
-        
-        server.login(email_config["username"], email_config["password"])
-        server.send_message(msg)
-        server.quit()
+        try:
+            pool.get(email_config).send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # 复用的连接已被服务器关闭，重新连接后再试一次
+            pool.get(email_config, fresh=True).send_message(msg)
         logger.info("[发送通知] 邮件发送成功")
     except Exception as e:
-        logger.error(f"[发送通知] 邮件失败: {type(e).__name__}: {str(e)}")
\ No newline at end of file
+        pool.close()
+        logger.error(f"[发送通知] 邮件失败: {type(e).__name__}: {str(e)}")
+    finally:
+        if smtp is None:
+            pool.close()
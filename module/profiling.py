@@ -0,0 +1,182 @@
+"""
+单轮性能剖析
+
+对一次 main_task 同时启用 cProfile 与 tracemalloc，结束后在日志目录写出：
+- profile-<时间>.pstats      cProfile 原始数据，可用 `python -m pstats` 或 snakeviz 查看
+- profile-<时间>-alloc.txt   tracemalloc 内存分配 Top N（按代码行汇总）与峰值
+- profile-<时间>-stages.json 本轮各阶段耗时（来自 module.metrics 的累计耗时差值）
+
+触发方式（本模块只在需要剖析时由 main 导入）：
+- 环境变量 VOID_PROFILE=1 或配置 profiling.enabled: True：每一轮都剖析（见 RuntimePlan.profile_every_cycle）
+- 向运行中的进程发送 SIGUSR1（docker kill -s USR1 <容器>）：立即执行一轮带剖析的扫描
+
+扫描、删除、获取种子数据都在工作线程中进行，Python 3.12 之前 cProfile 只作用于调用线程，
+因此剖析期间新启动的工作线程各自在线程内启用、停用一个 Profile，已结束线程的数据合并到同一个 pstats 文件中；
+守护线程（通知发送、指标服务、实时监控）与进程同生命周期，不剖析，避免剖析结束后仍挂着 Profile
+"""
+
+import cProfile
+import io
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple, TypeVar
+
+from tools import logs
+from module import metrics
+
+logger = logs.logs_configuration()
+
+T = TypeVar("T")
+
+DEFAULT_TOP_N = 30
+
+# tracemalloc 记录的调用栈深度，越深开销越大
+_TRACE_FRAMES = 10
+
+def _stage_totals() -> Dict[Tuple, float]:
+    return metrics.snapshot("stage_duration_seconds_total")
+
+
+class _ThreadProfiles:
+    """
+    剖析期间新启动的非守护线程各自在线程内启用一个 cProfile，run 返回时在同一线程内停用
+    （Python 3.12 起 cProfile 本身覆盖所有线程，无需处理）
+    """
+
+    def __init__(self):
+        self._finished: List[cProfile.Profile] = []
+        self._running = 0
+        self._lock = threading.Lock()
+        self._original_run = None
+
+    def _wrap(self, original_run):
+        owner = self
+
+        def run(thread: threading.Thread) -> None:
+            # 剖析已结束或守护线程：不剖析
+            if thread.daemon or owner._original_run is None:
+                return original_run(thread)
+            profile = cProfile.Profile()
+            with owner._lock:
+                owner._running += 1
+            profile.enable()
+            try:
+                return original_run(thread)
+            finally:
+                profile.disable()
+                with owner._lock:
+                    owner._running -= 1
+                    owner._finished.append(profile)
+
+        return run
+
+    def start(self) -> None:
+        if sys.version_info < (3, 12):
+            self._original_run = threading.Thread.run
+            threading.Thread.run = self._wrap(self._original_run)
+
+    def stop(self) -> None:
+        """恢复 Thread.run，之后启动的线程不再剖析；已在剖析的线程在各自结束时停用"""
+        if self._original_run is not None:
+            threading.Thread.run = self._original_run
+            self._original_run = None
+
+    def finished(self) -> List[cProfile.Profile]:
+        """已结束线程的 Profile，仍在运行的线程不合并（其 Profile 仍在使用中）"""
+        with self._lock:
+            if self._running:
+                logger.info(f"[性能剖析] {self._running} 个工作线程仍在运行，其数据不计入本次报告")
+            return list(self._finished)
+
+
+def run_profiled(task: Callable[[], T], config: dict) -> T:
+    """剖析执行一次 task 并返回其结果，报告写入日志目录；剖析本身出错不影响任务执行"""
+    top_n = int((config.get('profiling') or {}).get('top_n', DEFAULT_TOP_N))
+    output_dir = (config.get('profiling') or {}).get('output_dir') or logs.log_dir()
+    prefix = os.path.join(output_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S')}")
+
+    logger.info(f"[性能剖析] 开始剖析本轮任务，报告将写入 {prefix}-*")
+    stages_before = _stage_totals()
+    threads = _ThreadProfiles()
+    profile = cProfile.Profile()
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start(_TRACE_FRAMES)
+    tracemalloc.reset_peak()
+
+    start = time.perf_counter()
+    threads.start()
+    profile.enable()
+    try:
+        return task()
+    finally:
+        profile.disable()
+        threads.stop()
+        elapsed = time.perf_counter() - start
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if not already_tracing:
+            tracemalloc.stop()
+
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            _write_pstats(prefix, profile, threads.finished(), top_n)
+            _write_allocations(prefix, snapshot, current, peak, top_n)
+            _write_stages(prefix, stages_before, elapsed)
+            logger.info(f"[性能剖析] 完成，本轮耗时 {elapsed:.2f} 秒，内存峰值 {peak / (1024 * 1024):.1f} MB")
+        except Exception as e:
+            logger.error(f"[性能剖析] 写出报告失败: {e}")
+
+
+def _write_pstats(prefix: str, profile: cProfile.Profile, thread_profiles: List[cProfile.Profile], top_n: int) -> None:
+    import pstats
+
+    stats = pstats.Stats(profile)
+    for thread_profile in thread_profiles:
+        try:
+            stats.add(thread_profile)
+        except (TypeError, ValueError):
+            # 线程未执行任何代码时没有数据
+            continue
+    stats.dump_stats(prefix + ".pstats")
+
+    # 日志中顺带给出累计耗时最高的函数，不必下载 pstats 也能看出大概
+    buffer = io.StringIO()
+    stats.stream = buffer
+    stats.sort_stats("cumulative").print_stats(top_n)
+    logger.debug(f"[性能剖析] 累计耗时 Top {top_n}:\n{buffer.getvalue()}")
+
+
+def _write_allocations(prefix: str, snapshot: tracemalloc.Snapshot, current: int, peak: int, top_n: int) -> None:
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    lines = [
+        f"当前已分配: {current / (1024 * 1024):.2f} MB",
+        f"本轮峰值: {peak / (1024 * 1024):.2f} MB",
+        "",
+        f"按代码行汇总的内存分配 Top {top_n}（剖析结束时仍存活的对象）:",
+    ]
+    for index, stat in enumerate(snapshot.statistics("lineno")[:top_n], 1):
+        frame = stat.traceback[0]
+        lines.append(
+            f"#{index:<3} {stat.size / 1024:>10.1f} KiB  {stat.count:>8} 个  {frame.filename}:{frame.lineno}"
+        )
+    with open(prefix + "-alloc.txt", "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def _write_stages(prefix: str, before: Dict[Tuple, float], elapsed: float) -> None:
+    stages = []
+    for labels, total in _stage_totals().items():
+        delta = total - before.get(labels, 0.0)
+        if delta > 0:
+            stages.append({**dict(labels), "seconds": round(delta, 6)})
+    stages.sort(key=lambda item: item["seconds"], reverse=True)
+    with open(prefix + "-stages.json", "w", encoding="utf-8") as f:
+        json.dump({"cycle_seconds": round(elapsed, 6), "stages": stages}, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,100 @@
+"""
+qBittorrent 增量种子数据
+
+基于 sync/maindata 接口：首次请求获取全量数据，之后携带上一次的 rid 只获取
+新增、变化和删除的种子，在内存中增量维护保存路径与内容路径集合。
+种子无变化时每轮只有一次几乎为空的请求，不再重复下载和解析完整的种子列表。
+"""
+
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Set, Tuple
+
+from tools import logs
+
+logger = logs.logs_configuration()
+
+# 只保留路径计算需要的字段，其余字段（速度、进度等）直接丢弃
+_TRACKED_FIELDS = ("save_path", "name")
+
+# (原始保存路径, 种子名称) -> (本地保存路径, 本地内容路径)
+PathResolver = Callable[[str, str], Tuple[str, str]]
+
+
+class QBittorrentSyncInventory:
+    """单个 qBittorrent 实例的增量种子路径集合"""
+
+    def __init__(self, client, resolve_paths: PathResolver):
+        self.client = client
+        self._resolve_paths = resolve_paths
+        self._lock = threading.Lock()
+        self.rid = 0
+        self._torrents: Dict[str, Dict[str, str]] = {}
+        self._paths: Dict[str, Tuple[str, str]] = {}
+        self._save_refs: Counter = Counter()
+        self._content_refs: Counter = Counter()
+
+    def _reset(self) -> None:
+        self._torrents.clear()
+        self._paths.clear()
+        self._save_refs.clear()
+        self._content_refs.clear()
+
+    def _drop_paths(self, torrent_hash: str) -> None:
+        paths = self._paths.pop(torrent_hash, None)
+        if paths is None:
+            return
+        save_path, content_path = paths
+        for refs, path in ((self._save_refs, save_path), (self._content_refs, content_path)):
+            refs[path] -= 1
+            if refs[path] <= 0:
+                del refs[path]
+
+    def _apply(self, torrent_hash: str, delta: dict) -> None:
+        torrent = self._torrents.setdefault(torrent_hash, {})
+        changed = False
+        for field in _TRACKED_FIELDS:
+            if field in delta and torrent.get(field) != delta[field]:
+                torrent[field] = delta[field]
+                changed = True
+        if not changed or len(torrent) < len(_TRACKED_FIELDS):
+            return
+
+        self._drop_paths(torrent_hash)
+        save_path, content_path = self._resolve_paths(torrent["save_path"], torrent["name"])
+        self._paths[torrent_hash] = (save_path, content_path)
+        self._save_refs[save_path] += 1
+        self._content_refs[content_path] += 1
+
+    def refresh(self) -> Tuple[Set[str], Set[str]]:
+        """拉取自上次 rid 以来的变化并返回 (保存路径集合, 内容路径集合)"""
+        with self._lock:
+            data = self.client.sync_maindata(rid=self.rid)
+
+            if data.get("full_update"):
+                self._reset()
+
+            removed = data.get("torrents_removed") or []
+            for torrent_hash in removed:
+                self._torrents.pop(torrent_hash, None)
+                self._drop_paths(torrent_hash)
+
+            changes = data.get("torrents") or {}
+            for torrent_hash, delta in changes.items():
+                self._apply(torrent_hash, delta)
+
+            self.rid = data.get("rid", self.rid)
+            logger.debug(
+                f"[增量同步] rid={self.rid} 全量={bool(data.get('full_update'))} "
+                f"变化 {len(changes)} 个，删除 {len(removed)} 个，共 {len(self._torrents)} 个种子"
+            )
+            return set(self._save_refs), set(self._content_refs)
+
+    def torrents(self) -> List[Tuple[str, str, str]]:
+        """当前种子的 (infohash, 原始保存路径, 种子名称)，供精确模式获取文件列表"""
+        with self._lock:
+            return [
+                (torrent_hash, torrent["save_path"], torrent["name"])
+                for torrent_hash, torrent in self._torrents.items()
+                if len(torrent) == len(_TRACKED_FIELDS)
+            ]
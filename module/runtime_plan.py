@@ -0,0 +1,109 @@
+"""
+运行计划
+
+配置文件解析后编译为只读的运行计划：规范化的排除路径、编译好的路径映射、
+扫描调度器等派生结构只在配置内容变化时构建一次，之后的每一轮扫描直接复用
+"""
+
+import os
+from types import MappingProxyType
+from typing import FrozenSet, Mapping, NamedTuple, Optional, Tuple
+
+from tools import logs
+from module import cleanup, inventory, inventory_snapshot, unseeded
+from module.exclusion import ExclusionMatcher
+from module.scan_scheduler import ScanScheduler
+from module.unseeded import PathMapper, normalize_path
+
+logger = logs.logs_configuration()
+
+DEFAULT_CHECK_INTERVAL = 60  # 分钟
+DEFAULT_RECONCILE_INTERVAL = 1440  # 分钟，实时监控模式下的完整扫描周期
+
+# 设置为 1 时每一轮都剖析（module.profiling）
+PROFILE_ENV = "VOID_PROFILE"
+
+
+def _profiling_enabled(config: dict) -> bool:
+    if os.getenv(PROFILE_ENV, "").lower() in ("1", "true", "yes", "on"):
+        return True
+    return bool((config.get('profiling') or {}).get('enabled', False))
+
+
+class RuntimePlan(NamedTuple):
+    """一份配置对应的运行计划，构建后不再修改"""
+    version: int                            # 对应 ConfigManager.version
+    config: dict                            # 原始配置，供通知等按键读取
+    global_mode: bool
+    services: Tuple[dict, ...]
+    scan_paths: Tuple[str, ...]             # 全局模式扫描路径
+    excluded_paths: FrozenSet[str]          # 规范化后的排除路径
+    exclusions: ExclusionMatcher            # 编译后的排除规则
+    min_size: int                           # 文件大小阈值（MB）
+    auto_remove: bool
+    delete_workers: int
+    fetch_options: Mapping[str, float]      # inventory.fetch_options
+    scheduler: ScanScheduler
+    path_mappers: Mapping[str, PathMapper]  # 下载器名称 -> 编译好的路径映射
+    check_interval: int                     # 完整扫描周期（分钟）
+    reconcile_interval: int                 # 实时监控模式下的完整扫描周期（分钟）
+    profile_every_cycle: bool               # 每一轮都剖析（环境变量或配置）
+
+    def schedule_interval(self, watching: bool) -> int:
+        """当前应使用的完整扫描周期"""
+        return self.reconcile_interval if watching else self.check_interval
+
+
+def _compile_path_mappers(services: Tuple[dict, ...], previous: Optional[RuntimePlan]) -> Mapping[str, PathMapper]:
+    """映射配置未变化的下载器沿用上一版计划的映射表（保留其中已转换的保存路径）"""
+    old = previous.path_mappers if previous is not None else {}
+    mappers = {}
+    for item in services:
+        name = item.get('name', 'Unknown')
+        mapper = unseeded.get_path_mapper(item)
+        if name in old and old[name].key == mapper.key:
+            mapper = old[name]
+        mappers[name] = mapper
+    return MappingProxyType(mappers)
+
+
+def compile_plan(config: dict, version: int = 0, previous: Optional[RuntimePlan] = None) -> RuntimePlan:
+    """
+    编译运行计划，只构建派生结构，不修改任何运行中的状态；
+    编译失败时上一版计划不受影响，计划被采用时由 activate_plan 同步各模块的状态
+    """
+    services = tuple(config.get('services', []) or [])
+
+    global_scan_config = config.get('global_scan', {}) or {}
+    watch_config = config.get('watch_mode') or {}
+    excluded_paths = frozenset(normalize_path(p) for p in config.get('excluded_paths', []) or [])
+    plan = RuntimePlan(
+        version=version,
+        config=config,
+        global_mode=bool(global_scan_config.get('enabled', False)),
+        services=services,
+        scan_paths=tuple(global_scan_config.get('scan_paths', []) or []),
+        excluded_paths=excluded_paths,
+        exclusions=ExclusionMatcher(excluded_paths),
+        min_size=config.get('checkfile_size', 0),
+        auto_remove=bool(config.get('enable_auto_remove', False)),
+        delete_workers=int(config.get('delete_workers', cleanup.DEFAULT_DELETE_WORKERS)),
+        fetch_options=MappingProxyType(inventory.fetch_options(config)),
+        scheduler=ScanScheduler.from_config(config),
+        path_mappers=_compile_path_mappers(services, previous),
+        check_interval=int(config.get('check_interval', DEFAULT_CHECK_INTERVAL)),
+        reconcile_interval=int(watch_config.get('reconcile_interval', DEFAULT_RECONCILE_INTERVAL)),
+        profile_every_cycle=_profiling_enabled(config),
+    )
+    logger.debug(
+        f"[运行计划] 第 {version} 版：{len(services)} 个下载器，排除路径 {len(plan.excluded_paths)} 个，"
+        f"周期 {plan.check_interval} 分钟"
+    )
+    return plan
+
+
+def activate_plan(plan: RuntimePlan) -> None:
+    """采用新计划：释放已从配置中移除的下载器连接与同步状态，按新配置打开快照存储"""
+    # 客户端注册表与配置保持一致，其余连接跨轮次复用
+    unseeded.prune_services(plan.path_mappers.keys())
+    inventory_snapshot.configure(plan.config)
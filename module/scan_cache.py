@@ -0,0 +1,161 @@
+"""
+增量扫描缓存
+
+使用 SQLite 持久化记录每个目录的 mtime/inode 以及目录内的文件（含 stat 信息）与子目录，
+下一轮扫描时目录未发生变化则直接复用缓存的列表，不再重新读取目录内容。
+每隔 N 轮强制执行一次完整扫描，用于兜底缓存无法感知的变化（例如文件原地追加写入）。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from tools import logs
+
+logger = logs.logs_configuration()
+
+SCHEMA_VERSION = 2
+
+# 刚修改过的目录不写入缓存，避免同一时间粒度内的后续变化被忽略
+_MTIME_SETTLE_NS = 2 * 1_000_000_000
+
+# 批量写入的阈值
+_FLUSH_BATCH = 500
+
+# 文件条目: (文件名, 大小, mtime, inode, 设备号, 硬链接数)
+FileEntry = Tuple[str, int, float, int, int, int]
+Listing = Tuple[List[FileEntry], List[str]]
+
+
+class ScanCache:
+    """目录列表缓存，一个实例对应一轮扫描"""
+
+    def __init__(self, db_path: str, full_rescan_every: int = 24):
+        self._open(db_path)
+        self._init_schema()
+
+        self.cycle = int(self._get_meta("cycle", "0")) + 1
+        self._set_meta("cycle", str(self.cycle))
+        # full_rescan_every <= 0 表示从不强制完整扫描
+        self.full_rescan = full_rescan_every > 0 and self.cycle % full_rescan_every == 0
+        self._conn.commit()
+
+        if self.full_rescan:
+            logger.info(f"[扫描缓存] 第 {self.cycle} 轮，执行强制完整扫描")
+        else:
+            logger.info(f"[扫描缓存] 第 {self.cycle} 轮，启用增量扫描")
+
+    def _open(self, db_path: str) -> None:
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._pending = []
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    def worker_args(self) -> tuple:
+        """供并行扫描的子进程调用 attach 使用的参数"""
+        return self.db_path, self.cycle, self.full_rescan
+
+    @classmethod
+    def attach(cls, db_path: str, cycle: int, full_rescan: bool) -> "ScanCache":
+        """在子进程中打开同一缓存，沿用父进程的轮次，不再递增计数"""
+        cache = cls.__new__(cls)
+        cache._open(db_path)
+        cache.cycle = cycle
+        cache.full_rescan = full_rescan
+        return cache
+
+    def _init_schema(self) -> None:
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        if self._get_meta("schema_version") != str(SCHEMA_VERSION):
+            # 结构变化时直接丢弃旧缓存，下一轮相当于完整扫描
+            self._conn.execute("DROP TABLE IF EXISTS dirs")
+            self._set_meta("schema_version", str(SCHEMA_VERSION))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            " path TEXT PRIMARY KEY, mtime_ns INTEGER, ino INTEGER,"
+            " files TEXT, subdirs TEXT, cycle INTEGER)"
+        )
+        self._conn.commit()
+
+    def _get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def lookup(self, path: str, st: os.stat_result) -> Optional[Listing]:
+        """目录的 mtime 与 inode 均未变化时返回缓存的 (文件列表, 子目录列表)"""
+        if self.full_rescan:
+            self.add_counts(0, 1)
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mtime_ns, ino, files, subdirs FROM dirs WHERE path = ?", (path,)
+            ).fetchone()
+            # 计数与查询在同一把锁内更新，多个扫描线程共享缓存时不丢失计数
+            if row is None or row[0] != st.st_mtime_ns or row[1] != st.st_ino:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return [tuple(f) for f in json.loads(row[2])], json.loads(row[3])
+
+    def add_counts(self, hits: int, misses: int) -> None:
+        """累加命中/未命中计数（多线程安全），子进程的计数也经此合并"""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def store(self, path: str, st: os.stat_result, listing: Listing) -> None:
+        """记录目录的最新列表，批量写入数据库"""
+        if time.time_ns() - st.st_mtime_ns < _MTIME_SETTLE_NS:
+            return
+        files, subdirs = listing
+        row = (path, st.st_mtime_ns, st.st_ino, json.dumps(files), json.dumps(subdirs), self.cycle)
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= _FLUSH_BATCH:
+                self._flush()
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO dirs (path, mtime_ns, ino, files, subdirs, cycle)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                self._pending,
+            )
+            self._conn.commit()
+            self._pending = []
+
+    def close(self, finalize: bool = True) -> None:
+        """写入剩余记录；完整扫描轮次顺带清理已不存在的目录（子进程传入 finalize=False）"""
+        with self._lock:
+            self._flush()
+            if finalize and self.full_rescan:
+                self._conn.execute("DELETE FROM dirs WHERE cycle < ?", (self.cycle,))
+                self._conn.commit()
+            self._conn.close()
+        if finalize:
+            logger.info(f"[扫描缓存] 命中 {self.hits} 个目录，重新读取 {self.misses} 个目录")
+
+
+def from_config(config: dict) -> Optional[ScanCache]:
+    """根据配置创建扫描缓存，未启用或打开失败时返回 None（退化为完整扫描）"""
+    cache_config = config.get('scan_cache') or {}
+    if not cache_config.get('enabled', False):
+        return None
+    db_path = cache_config.get('path') or os.path.join(logs.log_dir(), "scan_cache.db")
+    try:
+        return ScanCache(db_path, int(cache_config.get('full_rescan_every', 24)))
+    except (sqlite3.Error, OSError) as e:
+        logger.error(f"[扫描缓存] 无法打开缓存 {db_path}，本轮执行完整扫描: {e}")
+        return None
@@ -0,0 +1,151 @@
+"""
+扫描结果输出（NDJSON）
+
+通知报告只列出前 15 个文件，完整结果按行写入 NDJSON 文件（可选 gzip 压缩），
+边扫描边写入，不在内存中保留文件列表，供 jq、看板或启用自动删除前人工核对使用：
+    jq -c 'select(.type == "file")' scan-20260101-120000.ndjson
+    zcat scan-*.ndjson.gz | jq -r 'select(.type == "file" and .size > 1073741824) | .path'
+
+每一轮扫描一个文件，写入期间名为 *.partial，结束后改名，读到的文件总是完整的一轮。
+每行一个 JSON 对象，type 字段区分行的种类（schema 为 1 时的字段如下，只会新增字段，不会修改或删除）：
+- cycle   第一行：schema、mode（normal / global）、started_at（Unix 时间戳）
+- file    每个未做种文件：service、path、size（字节）、mtime（Unix 时间戳）、inode、dev、nlink、
+          reason（not_in_service：不属于该下载器的任何种子；not_in_any_service：不属于任何下载器的种子）、
+          action（report：仅报告；deleted：已删除；failed：删除失败）
+- summary 最后一行：finished_at、complete（本轮是否正常结束）、files、bytes、各 action 的文件数
+"""
+
+import gzip
+import json
+import os
+import time
+from typing import Callable, Dict, Optional
+
+from tools import logs
+from module.scanner import FileRecord
+
+logger = logs.logs_configuration()
+
+SCHEMA_VERSION = 1
+DEFAULT_KEEP = 30
+
+REASON_SERVICE = "not_in_service"
+REASON_GLOBAL = "not_in_any_service"
+
+ACTION_REPORT = "report"
+ACTION_DELETED = "deleted"
+ACTION_FAILED = "failed"
+
+_PREFIX = "scan-"
+_PARTIAL = ".partial"
+
+
+class ResultWriter:
+    """一轮扫描的结果文件，只在主循环线程中写入"""
+
+    def __init__(self, output_dir: str, mode: str, compress: bool = False, keep: int = DEFAULT_KEEP):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.keep = keep
+        self._suffix = ".ndjson.gz" if compress else ".ndjson"
+        self.path = self._unique_path(time.strftime("%Y%m%d-%H%M%S"))
+        self._partial = self.path + _PARTIAL
+        # 无法用 UTF-8 表示的路径（surrogateescape 解码）写成 \udcxx 转义，整行仍是合法 JSON
+        if compress:
+            self._file = gzip.open(self._partial, "wt", encoding="utf-8", errors="backslashreplace")
+        else:
+            self._file = open(self._partial, "w", encoding="utf-8", errors="backslashreplace")
+        self.failed = False
+        self.files = 0
+        self.bytes = 0
+        self.actions: Dict[str, int] = {ACTION_REPORT: 0, ACTION_DELETED: 0, ACTION_FAILED: 0}
+        self._write({"type": "cycle", "schema": SCHEMA_VERSION, "mode": mode, "started_at": time.time()})
+
+    def _unique_path(self, stamp: str) -> str:
+        path = os.path.join(self.output_dir, f"{_PREFIX}{stamp}{self._suffix}")
+        n = 1
+        while os.path.exists(path) or os.path.exists(path + _PARTIAL):
+            path = os.path.join(self.output_dir, f"{_PREFIX}{stamp}-{n:03d}{self._suffix}")
+            n += 1
+        return path
+
+    def _write(self, obj: dict) -> None:
+        if self.failed:
+            return
+        try:
+            self._file.write(json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n")
+        except OSError as e:
+            # 磁盘写满等情况下放弃本轮结果文件，扫描与删除照常进行
+            self.failed = True
+            logger.error(f"[扫描结果] 写入 {self._partial} 失败，本轮结果不再输出: {e}")
+
+    def write(self, record: FileRecord, service: str, reason: str, action: str) -> None:
+        self._write({
+            "type": "file", "service": service, "path": record.path, "size": record.size,
+            "mtime": record.mtime, "inode": record.ino, "dev": record.dev, "nlink": record.nlink,
+            "reason": reason, "action": action,
+        })
+        self.files += 1
+        self.bytes += record.size
+        self.actions[action] = self.actions.get(action, 0) + 1
+
+    def sink(self, service: str, reason: str) -> Callable[[FileRecord, str], None]:
+        """绑定服务名称与原因，供 cleanup.run_cleanup 的 on_result 使用"""
+        return lambda record, action: self.write(record, service, reason, action)
+
+    def close(self, complete: bool = True) -> None:
+        """写入汇总行并改为正式文件名，随后清理超出保留数量的旧文件"""
+        self._write({
+            "type": "summary", "finished_at": time.time(), "complete": complete,
+            "files": self.files, "bytes": self.bytes, "actions": self.actions,
+        })
+        try:
+            self._file.close()
+            if self.failed:
+                os.remove(self._partial)
+                return
+            os.replace(self._partial, self.path)
+        except OSError as e:
+            logger.error(f"[扫描结果] 写入 {self.path} 失败: {e}")
+            return
+        logger.info(f"[扫描结果] {self.files} 个文件已写入 {self.path}")
+        self._prune()
+
+    def _prune(self) -> None:
+        if self.keep <= 0:
+            return
+        try:
+            entries = [
+                entry for entry in os.scandir(self.output_dir)
+                if entry.name.startswith(_PREFIX) and entry.name.endswith((".ndjson", ".ndjson.gz"))
+            ]
+            # 按修改时间排序；时间相同（文件系统时间精度不足）时按文件名，同一秒内的序号已补零
+            names = [
+                entry.name for entry in sorted(
+                    entries, key=lambda entry: (entry.stat().st_mtime_ns, entry.name.split(".", 1)[0])
+                )
+            ]
+        except OSError:
+            return
+        for name in names[:-self.keep]:
+            try:
+                os.remove(os.path.join(self.output_dir, name))
+            except OSError as e:
+                logger.warning(f"[扫描结果] 无法删除旧文件 {name}: {e}")
+
+
+def from_config(config: dict, mode: str) -> Optional[ResultWriter]:
+    """根据配置为本轮扫描创建结果文件，未启用或无法创建时返回 None（不影响扫描）"""
+    output_config = config.get('scan_output') or {}
+    if not output_config.get('enabled', False):
+        return None
+    output_dir = output_config.get('dir') or os.path.join(logs.log_dir(), "results")
+    try:
+        return ResultWriter(
+            output_dir, mode,
+            compress=bool(output_config.get('compress', False)),
+            keep=int(output_config.get('keep', DEFAULT_KEEP)),
+        )
+    except OSError as e:
+        logger.error(f"[扫描结果] 无法在 {output_dir} 创建结果文件，本轮不输出: {e}")
+        return None
@@ -0,0 +1,285 @@
+"""
+并行扫描调度
+
+把扫描工作按扫描路径及其一级子目录拆分为独立任务，交给线程池或进程池并行遍历：
+- 任务按扫描路径轮流排列，不同磁盘（如 mergerfs 的各个分支）可以同时工作
+- 线程模式：os.scandir/stat 期间会释放 GIL，结果经有界队列流式返回
+- 进程模式（仅支持 fork 的平台）：子进程以写时复制方式共享做种索引，每个子树的结果整体返回
+所有结果最终合并为一个生成器，调用方无需关心是否并行
+
+硬链接感知模式（hardlink_aware）：遍历时同时收集做种文件的 inode，
+链接数大于 1 的候选文件推迟到遍历结束后判断，只要任意一个链接在做种即视为做种中
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from tools import logs
+from module.scan_cache import ScanCache
+from module.scanner import (
+    FileRecord, ScanStats, collect_seeded_inodes, flush_error_log, iter_unseeded_files, split_root,
+)
+from module.exclusion import ExclusionMatcher
+from module.seeded_index import PathIndex, SeededInodeIndex, SeededPathIndex
+
+logger = logs.logs_configuration()
+
+# 线程模式下扫描结果的缓冲上限，消费方处理不过来时扫描线程在此等待
+QUEUE_SIZE = 4096
+
+# 进程模式：父进程在创建进程池前写入，fork 出的子进程直接读取，无需序列化索引
+_shared: dict = {}
+
+
+class _TaskDone:
+    """线程任务结束标记，携带该任务的计数"""
+
+    def __init__(self, root: str, stats: ScanStats):
+        self.root = root
+        self.stats = stats
+
+
+def _interleave(roots: List[str], subdirs_by_root: Dict[str, List[str]]) -> List[Tuple[str, str]]:
+    """按扫描路径轮流排列任务，避免所有线程同时挤在同一块磁盘上"""
+    tasks = []
+    queues = [(root, list(subdirs_by_root.get(root, []))) for root in roots]
+    while any(subdirs for _, subdirs in queues):
+        for root, subdirs in queues:
+            if subdirs:
+                tasks.append((root, subdirs.pop(0)))
+    return tasks
+
+
+def _process_task(
+    subdir: str, min_size_bytes: int, cache_args: Optional[tuple]
+) -> Tuple[List[FileRecord], ScanStats, int, int, Set[Tuple[int, int]]]:
+    """进程池任务：遍历一个子目录，返回 (未做种文件, 计数, 缓存命中, 缓存未命中, 做种文件 inode)"""
+    cache = ScanCache.attach(*cache_args) if cache_args else None
+    inodes = SeededInodeIndex() if _shared["hardlink_aware"] else None
+    stats = ScanStats()
+    try:
+        records = list(iter_unseeded_files(
+            subdir, _shared["seeded"], _shared["excluded"], min_size_bytes, stats, cache, inodes
+        ))
+    finally:
+        if cache:
+            cache.close(finalize=False)
+    return (
+        records, stats, (cache.hits if cache else 0), (cache.misses if cache else 0),
+        (inodes.inodes if inodes is not None else set())
+    )
+
+
+def _resolve_hardlinks(
+    records: Iterator[FileRecord],
+    inodes: SeededInodeIndex,
+    roots: List[str],
+    seed_paths: Iterable[str],
+    min_size_bytes: int,
+    cache: Optional[ScanCache],
+) -> Iterator[FileRecord]:
+    """
+    单链接文件直接产出；多链接文件等遍历（inode 收集）结束后再与做种 inode 比对
+
+    本轮遍历时刚 stat 过的单链接文件直接使用扫描结果；只有多链接文件与 stat 信息来自增量缓存的文件
+    （在别处新建硬链接不会改变本目录的 mtime，缓存中的链接数可能已过期）才重新 stat 一次
+    """
+    deferred = []
+    for record in records:
+        if record.cached or record.nlink > 1:
+            try:
+                st = os.stat(record.path)
+            except OSError:
+                continue
+            record = record._replace(ino=st.st_ino, dev=st.st_dev, nlink=st.st_nlink, cached=False)
+        if record.nlink > 1:
+            deferred.append(record)
+        else:
+            yield record
+
+    if not deferred:
+        return
+
+    # 扫描路径之外的做种内容没有被遍历到，只在确实存在待判断的多链接文件时才补充收集
+    root_index = SeededPathIndex(roots)
+    outside = [path for path in seed_paths if not root_index.contains(path)]
+    if outside:
+        stats = ScanStats()
+        for path in outside:
+            collect_seeded_inodes(path, inodes, min_size_bytes, stats, cache)
+        logger.info(f"[硬链接] 补充遍历扫描路径外的做种内容 {len(outside)} 项（{stats.dirs} 个目录）")
+
+    seeded = 0
+    for record in deferred:
+        if inodes.contains(record.dev, record.ino):
+            seeded += 1
+            continue
+        yield record
+    logger.info(
+        f"[硬链接] 做种文件 inode {len(inodes)} 个，多链接候选 {len(deferred)} 个，"
+        f"其中 {seeded} 个与做种文件为同一 inode"
+    )
+
+
+def _fork_available() -> bool:
+    import multiprocessing
+
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+class ScanScheduler:
+    """扫描调度器，workers <= 1 时退化为逐个目录顺序扫描"""
+
+    def __init__(self, workers: int = 1, executor: str = "thread", hardlink_aware: bool = False):
+        self.workers = max(1, int(workers))
+        self.executor = (executor or "thread").lower()
+        self.hardlink_aware = bool(hardlink_aware)
+        if self.executor == "process" and not _fork_available():
+            logger.warning("[并行扫描] 当前平台不支持 fork，进程模式改为线程模式")
+            self.executor = "thread"
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ScanScheduler":
+        return cls(
+            config.get('scan_workers', 1),
+            config.get('scan_executor', 'thread'),
+            config.get('hardlink_aware', False)
+        )
+
+    def scan(
+        self,
+        roots: List[str],
+        seeded_index: PathIndex,
+        excluded_index: ExclusionMatcher,
+        min_size_bytes: int,
+        stats_by_root: Dict[str, ScanStats],
+        cache: Optional[ScanCache] = None,
+        seed_paths: Iterable[str] = (),
+    ) -> Iterator[FileRecord]:
+        """
+        扫描所有 roots（需已规范化且存在），逐个产出未做种文件
+
+        每个扫描路径的计数写入 stats_by_root[root]；
+        seed_paths 为规范化后的做种内容路径，仅硬链接感知模式使用
+        """
+        for root in roots:
+            stats_by_root.setdefault(root, ScanStats())
+
+        try:
+            if not self.hardlink_aware:
+                yield from self._scan(roots, seeded_index, excluded_index, min_size_bytes, stats_by_root, cache, None)
+                return
+
+            inodes = SeededInodeIndex()
+            records = self._scan(roots, seeded_index, excluded_index, min_size_bytes, stats_by_root, cache, inodes)
+            yield from _resolve_hardlinks(records, inodes, roots, seed_paths, min_size_bytes, cache)
+        finally:
+            flush_error_log()
+
+    def _scan(self, roots, seeded_index, excluded_index, min_size_bytes, stats_by_root, cache, inodes):
+        if self.workers <= 1:
+            for root in roots:
+                yield from iter_unseeded_files(
+                    root, seeded_index, excluded_index, min_size_bytes, stats_by_root[root], cache, inodes
+                )
+            return
+
+        # 扫描路径本层的文件直接处理，一级子目录拆分为并行任务
+        subdirs_by_root = {}
+        for root in roots:
+            records, subdirs = split_root(
+                root, seeded_index, excluded_index, min_size_bytes, stats_by_root[root], cache, inodes
+            )
+            yield from records
+            subdirs_by_root[root] = subdirs
+        tasks = _interleave(roots, subdirs_by_root)
+        if not tasks:
+            return
+
+        logger.info(f"[并行扫描] {len(tasks)} 个子目录任务，{self.workers} 个{'进程' if self.executor == 'process' else '线程'}")
+        if self.executor == "process":
+            yield from self._scan_processes(tasks, seeded_index, excluded_index, min_size_bytes, stats_by_root, cache, inodes)
+        else:
+            yield from self._scan_threads(tasks, seeded_index, excluded_index, min_size_bytes, stats_by_root, cache, inodes)
+
+    def _scan_threads(self, tasks, seeded_index, excluded_index, min_size_bytes, stats_by_root, cache, inodes):
+        results: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+        cancel = threading.Event()
+
+        def put(item) -> None:
+            # 消费方提前结束时不能一直阻塞在满队列上
+            while not cancel.is_set():
+                try:
+                    results.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+
+        def run(root: str, subdir: str) -> None:
+            stats = ScanStats()
+            try:
+                for record in iter_unseeded_files(
+                    subdir, seeded_index, excluded_index, min_size_bytes, stats, cache, inodes
+                ):
+                    if cancel.is_set():
+                        break
+                    put(record)
+            except Exception as e:
+                stats.errors += 1
+                logger.error(f"[并行扫描] 扫描 {subdir} 失败: {e}")
+            finally:
+                put(_TaskDone(root, stats))
+
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scan")
+        try:
+            for root, subdir in tasks:
+                executor.submit(run, root, subdir)
+
+            remaining = len(tasks)
+            while remaining:
+                item = results.get()
+                if isinstance(item, _TaskDone):
+                    stats_by_root[item.root].merge(item.stats)
+                    remaining -= 1
+                else:
+                    yield item
+        finally:
+            cancel.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _scan_processes(self, tasks, seeded_index, excluded_index, min_size_bytes, stats_by_root, cache, inodes):
+        _shared["seeded"] = seeded_index
+        _shared["excluded"] = excluded_index
+        _shared["hardlink_aware"] = inodes is not None
+        cache_args = cache.worker_args() if cache else None
+        # 进程池相关模块只在进程模式下导入
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("fork"))
+        try:
+            futures = {
+                executor.submit(_process_task, subdir, min_size_bytes, cache_args): (root, subdir)
+                for root, subdir in tasks
+            }
+            for future in as_completed(futures):
+                root, subdir = futures[future]
+                try:
+                    records, stats, hits, misses, seeded_inodes = future.result()
+                except Exception as e:
+                    stats_by_root[root].errors += 1
+                    logger.error(f"[并行扫描] 扫描 {subdir} 失败: {e}")
+                    continue
+                stats_by_root[root].merge(stats)
+                if cache:
+                    cache.add_counts(hits, misses)
+                if inodes is not None:
+                    inodes.update(seeded_inodes)
+                yield from records
+        finally:
+            # 消费方提前结束（退出信号等）时不再等待排队中的子树任务，只等正在执行的任务结束
+            executor.shutdown(wait=True, cancel_futures=True)
+            _shared.clear()
@@ -0,0 +1,244 @@
+"""
+目录扫描引擎
+
+普通模式与全局模式共用的文件遍历实现：
+- 基于 os.scandir，文件的 stat 信息直接取自 DirEntry.stat()，不再额外 stat
+- 以生成器逐个产出 FileRecord，调用方可以边扫描边处理，内存占用不随文件数量增长
+- 目录一旦命中做种内容或排除规则，整棵子树直接跳过，不再向下遍历
+  （硬链接感知模式下做种目录仍会遍历，只记录其中文件的 inode，不产出记录）
+- 可选的增量扫描缓存：目录未变化时复用上一轮的目录列表
+"""
+
+import os
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from tools import logs
+from module.exclusion import ExclusionMatcher
+from module.seeded_index import PathIndex, SeededInodeIndex
+from module.scan_cache import FileEntry, Listing, ScanCache
+
+logger = logs.logs_configuration()
+
+# 百万级目录树中无法访问的文件可能很多，逐条日志限流，其余只计入 ScanStats.errors
+_access_errors = logs.RateLimitedLog(logger, "[扫描] 无法访问的文件/目录")
+
+
+class FileRecord(NamedTuple):
+    """扫描产出的文件记录"""
+    path: str
+    size: int
+    mtime: float
+    ino: int
+    dev: int
+    nlink: int
+    cached: bool = False    # stat 信息来自增量缓存（目录未变化），链接数可能已过期
+
+
+class ScanStats:
+    """单次扫描的计数器，供日志与报告使用"""
+
+    def __init__(self):
+        self.dirs = 0
+        self.files = 0
+        self.bytes = 0
+        self.pruned_seeded = 0
+        self.pruned_excluded = 0
+        self.errors = 0
+
+    def merge(self, other: "ScanStats") -> None:
+        """合并并行子任务的计数"""
+        for key, value in vars(other).items():
+            setattr(self, key, getattr(self, key) + value)
+
+
+def flush_error_log() -> None:
+    """一次扫描结束后输出被限流省略的访问错误条数"""
+    _access_errors.flush()
+
+
+def _scandir_target(path: str) -> str:
+    # Windows 盘符根目录规范化后为 "T:"，需要补回分隔符，否则会被解释为该盘的当前目录
+    if path.endswith(":"):
+        return path + os.sep
+    return path
+
+
+def _read_directory(path: str, stats: ScanStats) -> Optional[Listing]:
+    """读取目录，返回 (文件条目列表, 子目录名列表)"""
+    files = []
+    subdirs = []
+    try:
+        entries = os.scandir(_scandir_target(path))
+    except OSError as e:
+        stats.errors += 1
+        _access_errors.log("[扫描] 无法读取目录: %s - %s", path, e)
+        return None
+
+    with entries:
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        subdirs.append(entry.name)
+                    continue
+                st = entry.stat()
+                files.append((entry.name, st.st_size, st.st_mtime, st.st_ino, st.st_dev, st.st_nlink))
+            except OSError as e:
+                stats.errors += 1
+                _access_errors.log("[扫描] 无法访问文件: %s - %s", entry.path, e)
+    return files, subdirs
+
+
+def _list_directory(path: str, stats: ScanStats, cache: Optional[ScanCache]) -> Tuple[Optional[Listing], bool]:
+    """优先使用增量缓存，目录 mtime/inode 变化时才重新读取；返回 (目录列表, 是否来自缓存)"""
+    if cache is None:
+        return _read_directory(path, stats), False
+
+    try:
+        st = os.stat(_scandir_target(path))
+    except OSError as e:
+        stats.errors += 1
+        _access_errors.log("[扫描] 无法访问目录: %s - %s", path, e)
+        return None, False
+
+    listing = cache.lookup(path, st)
+    if listing is not None:
+        return listing, True
+    listing = _read_directory(path, stats)
+    if listing is not None:
+        cache.store(path, st, listing)
+    return listing, False
+
+
+def collect_seeded_inodes(
+    root: str,
+    inodes: SeededInodeIndex,
+    min_size_bytes: int,
+    stats: ScanStats,
+    cache: Optional[ScanCache] = None,
+) -> None:
+    """遍历做种内容（文件或目录），记录其中不小于 min_size_bytes 的文件 inode"""
+    if not os.path.isdir(_scandir_target(root)):
+        try:
+            st = os.stat(root)
+        except OSError:
+            return
+        if st.st_size >= min_size_bytes:
+            inodes.add(st.st_dev, st.st_ino)
+        return
+
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        listing, _ = _list_directory(current, stats, cache)
+        if listing is None:
+            continue
+        stats.dirs += 1
+        files, subdirs = listing
+        prefix = current if current.endswith(os.sep) else current + os.sep
+        stack.extend(prefix + name for name in subdirs)
+        for _, size, _, ino, dev, _ in files:
+            if size >= min_size_bytes:
+                inodes.add(dev, ino)
+
+
+def _visit(
+    current: str,
+    seeded_index: PathIndex,
+    excluded_index: ExclusionMatcher,
+    stats: ScanStats,
+    cache: Optional[ScanCache],
+    inodes: Optional[SeededInodeIndex] = None,
+    min_size_bytes: int = 0,
+) -> Optional[Tuple[str, List[FileEntry], List[str], bool]]:
+    """
+    处理单个目录的剪枝与读取，返回 (路径前缀, 文件条目, 子目录完整路径, 是否来自缓存)；
+    被剪枝或无法读取时返回 None
+    """
+    if excluded_index.contains(current):
+        stats.pruned_excluded += 1
+        return None
+    if seeded_index.contains(current):
+        # 整个目录就是做种内容，下面的文件必然都在做种
+        stats.pruned_seeded += 1
+        if inodes is not None:
+            collect_seeded_inodes(current, inodes, min_size_bytes, stats, cache)
+        return None
+
+    listing, cached = _list_directory(current, stats, cache)
+    if listing is None:
+        return None
+
+    stats.dirs += 1
+    files, subdirs = listing
+    prefix = current if current.endswith(os.sep) else current + os.sep
+    return prefix, files, [prefix + name for name in subdirs], cached
+
+
+def _unseeded_in(
+    prefix: str,
+    files: List[FileEntry],
+    seeded_index: PathIndex,
+    excluded_index: ExclusionMatcher,
+    min_size_bytes: int,
+    stats: ScanStats,
+    inodes: Optional[SeededInodeIndex] = None,
+    cached: bool = False,
+) -> Iterator[FileRecord]:
+    for name, size, mtime, ino, dev, nlink in files:
+        if size < min_size_bytes:
+            continue
+
+        full_path = prefix + name
+        # 名称与通配规则也作用于文件（如 *.!qB 临时文件）
+        if excluded_index.excludes_file(full_path, name):
+            continue
+
+        stats.files += 1
+        stats.bytes += size
+        if not seeded_index.contains(full_path):
+            yield FileRecord(full_path, size, mtime, ino, dev, nlink, cached)
+        elif inodes is not None:
+            inodes.add(dev, ino)
+
+
+def split_root(
+    root: str,
+    seeded_index: PathIndex,
+    excluded_index: ExclusionMatcher,
+    min_size_bytes: int,
+    stats: ScanStats,
+    cache: Optional[ScanCache] = None,
+    inodes: Optional[SeededInodeIndex] = None,
+) -> Tuple[List[FileRecord], List[str]]:
+    """只处理 root 这一层：返回 (root 下直接包含的未做种文件, 一级子目录)，供并行调度拆分任务"""
+    visited = _visit(root, seeded_index, excluded_index, stats, cache, inodes, min_size_bytes)
+    if visited is None:
+        return [], []
+    prefix, files, subdirs, cached = visited
+    return list(_unseeded_in(prefix, files, seeded_index, excluded_index, min_size_bytes, stats, inodes, cached)), subdirs
+
+
+def iter_unseeded_files(
+    root: str,
+    seeded_index: PathIndex,
+    excluded_index: ExclusionMatcher,
+    min_size_bytes: int,
+    stats: ScanStats,
+    cache: Optional[ScanCache] = None,
+    inodes: Optional[SeededInodeIndex] = None,
+) -> Iterator[FileRecord]:
+    """
+    遍历 root（需已规范化），逐个产出未做种文件的 FileRecord
+
+    符号链接指向的目录不会进入，与 os.walk 默认行为一致；
+    传入 inodes 时同时记录遇到的做种文件 inode（硬链接感知模式）
+    """
+    stack = [root]
+    while stack:
+        visited = _visit(stack.pop(), seeded_index, excluded_index, stats, cache, inodes, min_size_bytes)
+        if visited is None:
+            continue
+        prefix, files, subdirs, cached = visited
+        stack.extend(subdirs)
+        yield from _unseeded_in(prefix, files, seeded_index, excluded_index, min_size_bytes, stats, inodes, cached)
@@ -0,0 +1,171 @@
+"""
+做种路径索引模块
+
+将所有做种内容路径（种子的文件或文件夹）按路径分量构建为前缀树，
+判断某个文件是否属于做种内容时只需沿路径逐级查找，
+开销只与路径深度相关，与种子数量无关
+
+大规模做种清单使用 CompactPathIndex：一次构建的有序字节串数组，
+普通模式与全局模式的扫描共用，内存占用只有前缀树的几分之一
+"""
+
+import os
+from bisect import bisect_right
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+# 节点中的终止标记：路径分量不会为空字符串，因此可以安全地用作键
+_TERMINAL = ""
+
+# 下载中的文件名后缀：Transmission（rename-partial-files）与 qBittorrent（临时文件后缀）
+INCOMPLETE_SUFFIXES = (".part", ".!qB")
+
+
+def split_path(path: str) -> List[str]:
+    """
+    将规范化后的路径拆分为路径分量
+
+    Linux: "/data/movie/a.mkv" -> ["data", "movie", "a.mkv"]
+    Windows: "T:\\movie\\a.mkv" -> ["T:", "movie", "a.mkv"]
+    """
+    return [part for part in path.split(os.sep) if part]
+
+
+class SeededPathIndex:
+    """
+    做种路径前缀树
+
+    - 以路径分量为单位匹配，天然遵守分隔符边界（/data/movie 不会匹配 /data/movie2）
+    - 文件本身是做种内容，或位于某个做种目录下，都视为做种中
+    """
+
+    def __init__(self, paths: Iterable[str] = ()):
+        self._root: Dict[str, dict] = {}
+        self._count = 0
+        for path in paths:
+            self.add(path)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, path: str) -> None:
+        """添加一个规范化后的做种内容路径"""
+        if not path:
+            return
+        node = self._root
+        for part in split_path(path):
+            node = node.setdefault(part, {})
+        if _TERMINAL not in node:
+            node[_TERMINAL] = {}
+            self._count += 1
+
+    def contains(self, path: str) -> bool:
+        """判断路径本身或其任意上级目录是否为做种内容"""
+        node = self._root
+        if _TERMINAL in node:
+            return True
+        for part in split_path(path):
+            node = node.get(part)
+            if node is None:
+                return False
+            if _TERMINAL in node:
+                return True
+        return False
+
+    __contains__ = contains
+
+
+def _encode_key(path: str) -> bytes:
+    # 分隔符换成 \0：它小于任何其他字符，保证子路径在排序中紧跟在上级路径之后
+    return "\0".join(split_path(path)).encode("utf-8", "surrogateescape")
+
+
+class CompactPathIndex:
+    """
+    只读的紧凑做种路径索引，判断逻辑与 SeededPathIndex 相同
+
+    - 路径编码为以 \0 分隔路径分量的 UTF-8 字节串，排序后存放在一个列表中，
+      不再为每个路径分量建立字典节点，也不保留规范化前后的多份字符串
+    - 已被上级做种目录覆盖的路径在构建时丢弃，剩余路径互不包含，
+      因此查找时只需二分找到不大于目标路径的最后一项，检查它是否为目标路径本身或其上级目录
+    - 带下载中后缀（INCOMPLETE_SUFFIXES）的文件按去掉后缀的路径判断：精确模式下做种内容是逐个文件，
+      未完成的种子在磁盘上是 "文件名.part" / "文件名.!qB"，单文件种子在默认模式下也是如此
+    """
+
+    def __init__(self, paths: Iterable[str] = (), normalize: Optional[Callable[[str], str]] = None):
+        keys = sorted({
+            _encode_key(normalize(path) if normalize else path) for path in paths if path
+        })
+        # 根目录做种时所有路径都视为做种中
+        self._all = bool(keys) and keys[0] == b""
+        self._keys: List[bytes] = []
+        if self._all:
+            return
+        last = None
+        for key in keys:
+            if last is not None and key.startswith(last) and key[len(last)] == 0:
+                continue
+            self._keys.append(key)
+            last = key
+
+    def __len__(self) -> int:
+        return 1 if self._all else len(self._keys)
+
+    def __iter__(self) -> Iterator[str]:
+        """产出互不包含的做种内容路径（规范化形式）"""
+        if self._all:
+            yield os.sep
+            return
+        prefix = "" if os.sep == "\\" else os.sep
+        for key in self._keys:
+            yield prefix + key.decode("utf-8", "surrogateescape").replace("\0", os.sep)
+
+    def contains(self, path: str) -> bool:
+        """判断路径本身或其任意上级目录是否为做种内容，下载中的临时文件视为其目标文件"""
+        if self._all:
+            return True
+        if self._contains_key(_encode_key(path)):
+            return True
+        for suffix in INCOMPLETE_SUFFIXES:
+            if path.endswith(suffix):
+                target = path[:-len(suffix)]
+                # 文件名本身就是后缀（如 "/data/.part"）时没有目标文件
+                return bool(target) and not target.endswith(os.sep) and self._contains_key(_encode_key(target))
+        return False
+
+    def _contains_key(self, key: bytes) -> bool:
+        i = bisect_right(self._keys, key)
+        if not i:
+            return False
+        candidate = self._keys[i - 1]
+        return key.startswith(candidate) and (len(key) == len(candidate) or key[len(candidate)] == 0)
+
+    __contains__ = contains
+
+
+# 扫描器接受的做种路径索引类型
+PathIndex = Union[SeededPathIndex, CompactPathIndex]
+
+
+class SeededInodeIndex:
+    """
+    做种文件的 (st_dev, st_ino) 集合
+
+    硬链接到媒体库等位置的文件换了路径和名称，前缀树无法识别；
+    同一 inode 的任意一个链接在做种，其余链接也视为做种中
+    """
+
+    def __init__(self, inodes: Iterable[Tuple[int, int]] = ()):
+        self.inodes: Set[Tuple[int, int]] = set(inodes)
+
+    def __len__(self) -> int:
+        return len(self.inodes)
+
+    def add(self, dev: int, ino: int) -> None:
+        self.inodes.add((dev, ino))
+
+    def update(self, inodes: Iterable[Tuple[int, int]]) -> None:
+        """合并并行子任务（子进程）收集到的 inode"""
+        self.inodes.update(inodes)
+
+    def contains(self, dev: int, ino: int) -> bool:
+        return (dev, ino) in self.inodes
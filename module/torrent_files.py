@@ -0,0 +1,261 @@
+"""
+种子文件列表索引（精确模式）
+
+默认按 "保存路径/种子名称" 推断种子内容并做前缀匹配，遇到重命名过的文件、
+内容路径与名称不一致等情况会误判。精确模式获取每个种子的文件列表
+（qBittorrent torrents_files，Transmission files），得到做种文件的精确路径集合。
+
+文件列表按 infohash 缓存在 SQLite 中，每轮只需获取新增或名称变化的种子；
+单轮获取数量有上限，尚未获取到文件列表的种子本轮仍按内容路径前缀匹配。
+下载器不会通知种子内文件被重命名，缓存的列表可能已过时：未做种的候选文件位于
+使用缓存列表的种子目录下时，由 RenameGuard 重新获取该种子的文件列表后再判断。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from tools import logs
+from module.seeded_index import CompactPathIndex
+
+logger = logs.logs_configuration()
+
+# 单轮最多获取文件列表的种子数，首次启用时分多轮逐步补齐
+DEFAULT_MAX_FETCH = 500
+
+# 缓存的文件列表超过该天数重新获取，用于兜底种子内文件被重命名（下载器不会通知这类变化）
+DEFAULT_REFRESH_DAYS = 7
+
+# 超过该天数未出现在任何下载器中的种子从缓存中清理
+_FORGET_DAYS = 30
+
+# Transmission 每次请求文件列表的种子数
+_TRANSMISSION_CHUNK = 100
+
+
+class TorrentRef(NamedTuple):
+    """计算文件路径需要的种子信息（保存路径为下载器内的原始路径）"""
+    hash: str
+    save_path: str
+    name: str
+    id: object
+
+
+# (原始保存路径, 种子内相对路径) -> 本地完整路径
+FileResolver = Callable[[str, str], str]
+
+# 获取一批种子的文件列表，返回 {infohash: [相对路径, ...]}
+FileFetcher = Callable[[List[TorrentRef]], Dict[str, List[str]]]
+
+
+class TorrentFileCache:
+    """按 infohash 缓存的种子文件列表，所有下载器共用（多线程访问）"""
+
+    def __init__(self, db_path: str):
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS torrents ("
+            " hash TEXT PRIMARY KEY, name TEXT, files TEXT, fetched_at REAL, seen_at REAL)"
+        )
+        self._conn.execute("DELETE FROM torrents WHERE seen_at < ?", (time.time() - _FORGET_DAYS * 86400,))
+        self._conn.commit()
+
+    def get_many(self, hashes: Iterable[str]) -> Dict[str, Tuple[str, List[str], float]]:
+        """返回 {infohash: (种子名称, 文件列表, 获取时间)}，同时刷新这些种子的最后出现时间"""
+        hashes = list(hashes)
+        result = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT hash, name, files, fetched_at FROM torrents WHERE hash IN ({placeholders})", chunk
+                )
+                for torrent_hash, name, files, fetched_at in rows:
+                    result[torrent_hash] = (name, json.loads(files), fetched_at)
+                self._conn.execute(
+                    f"UPDATE torrents SET seen_at = ? WHERE hash IN ({placeholders})", [now] + chunk
+                )
+            self._conn.commit()
+        return result
+
+    def put_many(self, rows: Iterable[Tuple[str, str, List[str]]]) -> None:
+        """写入 (infohash, 种子名称, 文件列表)"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO torrents (hash, name, files, fetched_at, seen_at) VALUES (?, ?, ?, ?, ?)",
+                [(torrent_hash, name, json.dumps(files), now, now) for torrent_hash, name, files in rows],
+            )
+            self._conn.commit()
+
+
+_cache: Optional[TorrentFileCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_file_cache() -> TorrentFileCache:
+    """进程内共用一个缓存，无法打开磁盘文件时退化为内存缓存（重启后重新获取）"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            db_path = os.path.join(logs.log_dir(), "torrent_files.db")
+            try:
+                _cache = TorrentFileCache(db_path)
+            except (sqlite3.Error, OSError) as e:
+                logger.error(f"[精确模式] 无法打开文件列表缓存 {db_path}，改用内存缓存: {e}")
+                _cache = TorrentFileCache(":memory:")
+        return _cache
+
+
+def fetch_qbittorrent_files(client, torrents: List[TorrentRef]) -> Dict[str, List[str]]:
+    """qBittorrent 每个种子一次请求；单个种子失败只影响它自己"""
+    result = {}
+    for torrent in torrents:
+        try:
+            files = client.torrents_files(torrent_hash=torrent.hash)
+        except Exception as e:
+            logger.debug(f"[精确模式] 获取文件列表失败: {torrent.name} - {e}")
+            continue
+        result[torrent.hash] = [f["name"] for f in files]
+    return result
+
+
+def fetch_transmission_files(client, torrents: List[TorrentRef]) -> Dict[str, List[str]]:
+    """Transmission 按 id 分批请求 files 字段"""
+    result = {}
+    for start in range(0, len(torrents), _TRANSMISSION_CHUNK):
+        chunk = torrents[start:start + _TRANSMISSION_CHUNK]
+        try:
+            fetched = client.get_torrents(ids=[t.id for t in chunk], arguments=["hashString", "files"])
+        except Exception as e:
+            logger.debug(f"[精确模式] 获取文件列表失败: {e}")
+            continue
+        for t in fetched:
+            result[t.hashString] = [f["name"] for f in t.fields.get("files") or []]
+    return result
+
+
+def resolve_content_paths(
+    torrents: List[TorrentRef],
+    fetch_files: FileFetcher,
+    resolve_file: FileResolver,
+    max_fetch: int = DEFAULT_MAX_FETCH,
+    refresh_days: float = DEFAULT_REFRESH_DAYS,
+    cache: Optional[TorrentFileCache] = None,
+) -> Tuple[Set[str], int, List[TorrentRef]]:
+    """
+    计算做种内容路径集合
+
+    有文件列表的种子产出每个文件的精确路径，其余种子回退为 "保存路径/种子名称"
+
+    Returns:
+        (内容路径集合, 回退为前缀匹配的种子数, 本轮未重新获取、使用缓存列表的种子)
+    """
+    cache = cache or get_file_cache()
+    known = cache.get_many(t.hash for t in torrents)
+    now = time.time()
+
+    usable: Dict[str, List[str]] = {}
+    outdated = []
+    for torrent in torrents:
+        entry = known.get(torrent.hash)
+        # 种子（根目录）改名后旧列表不再可用
+        if entry is not None and entry[0] == torrent.name:
+            usable[torrent.hash] = entry[1]
+            if now - entry[2] < refresh_days * 86400:
+                continue
+        outdated.append(torrent)
+
+    # 新种子优先，过期刷新的排在后面
+    outdated.sort(key=lambda t: t.hash in usable)
+    to_fetch = outdated[:max(0, max_fetch)]
+    if to_fetch:
+        start = time.perf_counter()
+        fetched = fetch_files(to_fetch)
+        names = {t.hash: t.name for t in to_fetch}
+        cache.put_many((h, names[h], files) for h, files in fetched.items() if h in names)
+        usable.update(fetched)
+        logger.info(
+            f"[精确模式] 获取 {len(fetched)}/{len(to_fetch)} 个种子的文件列表，"
+            f"耗时 {time.perf_counter() - start:.2f} 秒，待获取 {len(outdated) - len(to_fetch)} 个"
+        )
+
+    fetched_now = {t.hash for t in to_fetch}
+    content_paths = set()
+    fallback = 0
+    cached = []
+    for torrent in torrents:
+        files = usable.get(torrent.hash)
+        if files:
+            content_paths.update(resolve_file(torrent.save_path, rel) for rel in files)
+            if torrent.hash not in fetched_now:
+                cached.append(torrent)
+        else:
+            content_paths.add(resolve_file(torrent.save_path, torrent.name))
+            fallback += 1
+    return content_paths, fallback, cached
+
+
+class RenameGuard:
+    """
+    复核位于使用缓存列表的种子目录（"保存路径/种子名称"）下的未做种候选文件
+
+    种子内文件被重命名后，新文件名不在缓存的文件列表中；每个种子每轮最多重新获取一次，
+    获取失败时按前缀匹配视为做种中（宁可漏删）
+    """
+
+    def __init__(self, torrents: List[TorrentRef], fetch_files: FileFetcher, resolve_file: FileResolver,
+                 cache: Optional[TorrentFileCache] = None):
+        self._roots = {resolve_file(t.save_path, t.name): t for t in torrents}
+        self._fetch_files = fetch_files
+        self._resolve_file = resolve_file
+        self._cache = cache or get_file_cache()
+        # infohash -> 重新获取后的文件索引，None 表示获取失败
+        self._fresh: Dict[str, Optional[CompactPathIndex]] = {}
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self._roots)
+
+    def _owner(self, path: str) -> Optional[TorrentRef]:
+        current = path
+        while True:
+            torrent = self._roots.get(current)
+            if torrent is not None:
+                return torrent
+            parent = os.path.dirname(current)
+            if parent == current:
+                return None
+            current = parent
+
+    def seeded(self, path: str) -> bool:
+        """path（规范化后的本地路径）按最新的文件列表是否属于做种内容"""
+        torrent = self._owner(path)
+        if torrent is None:
+            return False
+        with self._lock:
+            if torrent.hash not in self._fresh:
+                files = self._fetch_files([torrent]).get(torrent.hash)
+                index = None
+                if files is not None:
+                    self._cache.put_many([(torrent.hash, torrent.name, files)])
+                    index = CompactPathIndex(self._resolve_file(torrent.save_path, rel) for rel in files)
+                else:
+                    logger.warning(f"[精确模式] 无法重新获取 {torrent.name} 的文件列表，其目录下的文件本轮按名称匹配")
+                self._fresh[torrent.hash] = index
+            index = self._fresh[torrent.hash]
+        if index is None:
+            return True
+        if index.contains(path):
+            logger.info(f"[精确模式] {path} 属于种子 {torrent.name}（种子内文件已改名，文件列表已更新）")
+            return True
+        return False
@@ -1,14 +1,28 @@
 import os
 import platform
+import threading
+import time
 from pathlib import Path
-from typing import List, Set, Dict, Tuple, Optional
-import qbittorrentapi
-import transmission_rpc
+from typing import Callable, List, Set, Dict, Tuple, Optional, NamedTuple, Iterable, Iterator, Union
 from tools import logs
+from module import client_pool, metrics
+from module.client_pool import create_client
+from module.exclusion import ExclusionMatcher
+from module.seeded_index import CompactPathIndex
+from module.scanner import FileRecord, ScanStats
+from module.scan_cache import ScanCache
+from module.scan_scheduler import ScanScheduler
+from module.qbittorrent_sync import QBittorrentSyncInventory
+from module import torrent_files
+from module.torrent_files import TorrentRef
 
 logger = logs.logs_configuration()
 IS_WINDOWS = platform.system() == "Windows"
 
+# Transmission 只请求扫描用到的字段，避免传输 peers/trackers/files 等大字段
+TRANSMISSION_FIELDS = ["id", "name", "downloadDir", "hashString"]
+TRANSMISSION_PAGE_SIZE = 2000
+
 def normalize_path(path: str) -> str:
     """
     跨平台路径规范化
@@ -31,13 +45,90 @@ def normalize_path(path: str) -> str:
     
     return path
 
-def translate_path(docker_path: str, path_mapping: Dict[str, str]) -> str:
+def _parse_mapping(path_mapping: Dict[str, str]) -> Optional[Tuple[str, str]]:
     """
-    将容器路径转换为本地路径
-    
+    解析单条映射，返回 (容器路径, 本地路径)
+
     支持两种映射格式：
     1. 完整格式: {"remote": "/data", "local": "/mnt/user/data"}
     2. 简化格式: {"T:\\": "/download"} 或 {"/mnt/data": "/data"}
+    """
+    # 尝试完整格式（优先）
+    if 'remote' in path_mapping and 'local' in path_mapping:
+        return path_mapping['remote'], path_mapping['local']
+
+    # 简化格式：字典只有一个键值对，local: remote
+    # 例如： {"T:\\": "/download"} 表示本地T:\ 对应容器内的 /download
+    if len(path_mapping) != 1:
+        logger.warning(f"[路径映射] 格式不正确，跳过: {path_mapping}")
+        return None
+
+    local, remote = list(path_mapping.items())[0]
+    return remote, local
+
+def _split_remote(path: str) -> List[str]:
+    # 统一使用正斜杠进行比较（容器路径通常是Linux格式）
+    return [part for part in path.replace('\\', '/').split('/') if part]
+
+class PathMapper:
+    """
+    预编译的路径映射表
+
+    - 所有映射的容器路径按路径分量构建为前缀树，一次查找完成最长前缀匹配
+    - 缓存已转换的保存路径：大量种子共享少数几个保存目录
+    """
+
+    def __init__(self, mapping_list: List[Dict[str, str]]):
+        # 映射配置的文本形式，用于判断两个映射表是否等价
+        self.key = repr(mapping_list)
+        self._root: Dict[str, dict] = {}
+        self._cache: Dict[str, str] = {}
+        for mapping in mapping_list or []:
+            parsed = _parse_mapping(mapping)
+            if parsed is None:
+                continue
+            remote, local = parsed
+            node = self._root
+            for part in _split_remote(remote):
+                node = node.setdefault(part, {})
+            # 同一容器路径配置多次时以第一条为准
+            node.setdefault("", normalize_path(local))
+
+    def translate(self, docker_path: str) -> str:
+        """将容器路径转换为本地路径，未命中任何映射时原样返回"""
+        if not docker_path or not self._root:
+            return docker_path
+
+        cached = self._cache.get(docker_path)
+        if cached is not None:
+            return cached
+
+        parts = _split_remote(docker_path)
+        node = self._root
+        local = node.get("")
+        matched = 0
+        for depth, part in enumerate(parts, 1):
+            node = node.get(part)
+            if node is None:
+                break
+            if "" in node:
+                local, matched = node[""], depth
+
+        if local is None:
+            result = docker_path
+        elif matched == len(parts):
+            result = local
+        else:
+            # 使用本地系统的路径分隔符拼接剩余部分
+            relative_local = os.sep.join(parts[matched:])
+            result = normalize_path(local.rstrip(os.sep) + os.sep + relative_local)
+
+        self._cache[docker_path] = result
+        return result
+
+def translate_path(docker_path: str, path_mapping: Dict[str, str]) -> str:
+    """
+    将容器路径转换为本地路径（单条映射）
     
     Args:
         docker_path: 容器内的路径
@@ -46,183 +137,259 @@ def translate_path(docker_path: str, path_mapping: Dict[str, str]) -> str:
     Returns:
         转换后的本地路径
     """
-    if not docker_path or not path_mapping:
-        return docker_path
-    
-    # 尝试完整格式（优先）
-    if 'remote' in path_mapping and 'local' in path_mapping:
-        remote = path_mapping['remote']
-        local = path_mapping['local']
-    else:
-        # 简化格式：字典只有一个键值对，local: remote
-        # 例如： {"T:\\": "/download"} 表示本地T:\ 对应容器内的 /download
-        if len(path_mapping) != 1:
-            logger.warning(f"[路径映射] 格式不正确，跳过: {path_mapping}")
-            return docker_path
-        
-        local, remote = list(path_mapping.items())[0]
-    
-    # 标准化路径（不使用resolve避免跨平台问题）
-    # 移除末尾的分隔符以便比较
-    remote_normalized = remote.rstrip('/').rstrip('\\')
-    local_normalized = local.rstrip('/').rstrip('\\')
-    docker_path_normalized = docker_path.rstrip('/').rstrip('\\')
-    
-    # 统一使用正斜杠进行比较（容器路径通常是Linux格式）
-    remote_for_compare = remote_normalized.replace('\\', '/')
-    docker_for_compare = docker_path_normalized.replace('\\', '/')
-    
-    # 检查是否匹配（前缀匹配）
-    if docker_for_compare == remote_for_compare or docker_for_compare.startswith(remote_for_compare + '/'):
-        # 计算相对路径
-        if docker_for_compare == remote_for_compare:
-            relative_part = ""
-        else:
-            relative_part = docker_for_compare[len(remote_for_compare):].lstrip('/')
-        
-        # 构建本地路径
-        if relative_part:
-            # 使用本地系统的路径分隔符
-            relative_local = relative_part.replace('/', os.sep)
-            # 确保本地路径有分隔符再拼接（处理Windows盘符情况）
-            if local_normalized and not local_normalized.endswith(os.sep):
-                result = local_normalized + os.sep + relative_local
-            else:
-                result = local_normalized + relative_local
-        else:
-            result = local_normalized
-        
-        return normalize_path(result)
-    
-    return docker_path
+    return PathMapper([path_mapping]).translate(docker_path)
+
+def resolve_torrent_paths(raw_save_path: str, t_name: str, mapper: PathMapper) -> Tuple[str, str]:
+    """将种子的原始保存路径转换为本地路径，返回 (保存路径, 内容路径)"""
+    translated_save = mapper.translate(raw_save_path)
 
-def create_client(config: dict):
-    """创建并测试客户端连接"""
-    ctype = config.get("type", "").lower()
+    # 内容路径是种子的完整物理路径（文件或文件夹）
+    return translated_save, normalize_path(os.path.join(translated_save, t_name))
+
+def get_path_mapper(services: Dict) -> PathMapper:
+    """编译该服务的路径映射表；每轮扫描使用运行计划中编译好的 RuntimePlan.path_mappers"""
+    return PathMapper(services.get("path_mapping", []))
+
+def _rss_mb() -> Optional[float]:
+    """
+    进程当前常驻内存（MB），读取 /proc/self/statm，不支持的平台返回 None
+    （ru_maxrss 是进程生命周期内的峰值，第一轮大规模获取之后不再变化，无法反映单次获取）
+    """
     try:
-        if ctype == "qbittorrent":
-            client = qbittorrentapi.Client(
-                host=config["host"], port=config["port"],
-                username=config["username"], password=config["password"],
-                REQUESTS_ARGS={'timeout': (5, 15)} # (连接超时, 读取超时)
-            )
-            client.auth_log_in()
-            return client
-        elif ctype == "transmission":
-            return transmission_rpc.Client(
-                host=config["host"], port=config["port"],
-                username=config["username"], password=config["password"],
-                timeout=15
-            )
-    except Exception as e:
-        logger.error(f"[客户端] {config['name']} 连接失败: {e}")
-    return None
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+def iter_transmission_torrents(client, page_size: int = TRANSMISSION_PAGE_SIZE):
+    """只请求扫描需要的字段，种子数量较多时按 id 分页获取"""
+    ids = [t.id for t in client.get_torrents(arguments=["id"])]
+    for start in range(0, len(ids), page_size):
+        yield from client.get_torrents(ids=ids[start:start + page_size], arguments=TRANSMISSION_FIELDS)
 
 def get_torrents_data(client, client_type: str, mapping_list: List[Dict]) -> Tuple[Set[str], Set[str], Optional[str]]:
-    """一次性获取所有种子信息并完成路径转换"""
+    """一次性获取所有种子信息并完成路径转换，mapping_list 也可以是编译好的 PathMapper"""
+    mapper = mapping_list if isinstance(mapping_list, PathMapper) else PathMapper(mapping_list)
     save_paths = set()
     content_paths = set()
     
     try:
+        start = time.perf_counter()
+        rss_before = _rss_mb()
         if client_type == "qbittorrent":
             torrents = client.torrents_info()
         else: # transmission
-            torrents = client.get_torrents()
+            torrents = iter_transmission_torrents(client)
 
+        count = 0
         for t in torrents:
             # 获取原始路径
             raw_save_path = t.save_path if client_type == "qbittorrent" else t.download_dir
-            t_name = t.name
-            
-            # 对每个种子，尝试所有的路径映射关系
-            translated_save = raw_save_path
-            for mapping in mapping_list:
-                translated_save = translate_path(raw_save_path, mapping)
-                if translated_save != raw_save_path: # 只要命中一个映射就跳出
-                    break
+            translated_save, content_path = resolve_torrent_paths(raw_save_path, t.name, mapper)
             
             save_paths.add(translated_save)
-            # content_paths 存储的是种子的完整物理路径（文件或文件夹）
-            content_paths.add(normalize_path(os.path.join(translated_save, t_name)))
+            content_paths.add(content_path)
+            count += 1
 
+        # 多个下载器并发获取时差值包含其他线程的分配，仅作参考
+        rss_after = _rss_mb()
+        if rss_before is not None and rss_after is not None:
+            memory_str = f"{rss_after - rss_before:+.1f} MB（当前 {rss_after:.1f} MB）"
+        else:
+            memory_str = "未知"
+        logger.info(
+            f"[获取种子] {client_type}: {count} 个种子，耗时 {time.perf_counter() - start:.2f} 秒，"
+            f"常驻内存变化 {memory_str}"
+        )
         return save_paths, content_paths, None
     except Exception as e:
         return set(), set(), str(e)
 
-def scan_large_files(save_paths: Set[str], content_paths: Set[str], min_size_mb: int, excluded_paths: Set[str]) -> List[str]:
-    """高性能扫描未做种文件"""
-    unseeded_files = []
+def iter_large_files(save_paths: Set[str], content_paths: Set[str], min_size_mb: int, excluded_paths: Union[ExclusionMatcher, Set[str]], cache: Optional[ScanCache] = None, scheduler: Optional[ScanScheduler] = None, service_name: str = "Unknown") -> Iterator[FileRecord]:
+    """高性能扫描未做种文件，逐个产出 FileRecord（service_name 用于指标标签）"""
     min_size_bytes = min_size_mb * 1024 * 1024
     
     # 预处理排除路径和内容路径，提升匹配速度
-    norm_excluded = [normalize_path(p) for p in excluded_paths]
-    norm_content = {normalize_path(p) for p in content_paths}
+    excluded_index = excluded_paths if isinstance(excluded_paths, ExclusionMatcher) else ExclusionMatcher(
+        normalize_path(p) for p in excluded_paths
+    )
+    with metrics.timed("index_build", service=service_name):
+        seeded_index = CompactPathIndex(content_paths, normalize_path)
 
+    roots = []
     for base_path in save_paths:
         if not os.path.exists(base_path):
             logger.warning(f"[扫描] 路径不存在，跳过: {base_path}")
             continue
+        roots.append(normalize_path(base_path))
 
-        for root, dirs, files in os.walk(base_path):
-            curr_root = normalize_path(root)
-            
-            # 1. 排除检查
-            if any(curr_root.startswith(ex) for ex in norm_excluded):
-                dirs[:] = [] # 停止遍历该子目录
-                continue
+    # 命中做种内容或排除路径的目录整体跳过，文件信息直接取自目录项
+    stats_by_root: Dict[str, ScanStats] = {}
+    records = metrics.TimedIterator((scheduler or ScanScheduler()).scan(
+        roots, seeded_index, excluded_index, min_size_bytes, stats_by_root, cache, seeded_index
+    ))
+    yield from records
 
-            for file in files:
-                file_path = os.path.join(root, file)
-                full_path = normalize_path(file_path)
-                
-                try:
-                    # 2. 只有满足大小的文件才进行核心比对
-                    f_size = os.path.getsize(full_path)
-                    if f_size >= min_size_bytes:
-                        # 3. 核心逻辑：检查该文件是否属于任何一个活跃种子的内容
-                        # 使用路径前缀比对，处理种子是单文件或文件夹的情况
-                        is_seeded = False
-                        for seeded_p in norm_content:
-                            if full_path.startswith(seeded_p):
-                                is_seeded = True
-                                break
-                        
-                        if not is_seeded:
-                            unseeded_files.append(full_path)
-                            
-                except OSError:
-                    continue
-
-    return unseeded_files
-
-def find_unseeded_files(services: Dict, check_file_size: int, excluded_paths: Set[str]) -> Tuple[List[str], List[str]]:
-    """主入口函数"""
-    error_messages = []
-    
-    logger.info(f"[扫描开始] 服务: {services['name']} ({services['type']})")
-    
-    client = create_client(services)
+    stats = ScanStats()
+    for root_stats in stats_by_root.values():
+        stats.merge(root_stats)
+    metrics.observe_stage("walk", records.elapsed, service=service_name)
+    metrics.record_scan(stats, service_name)
+    logger.info(
+        f"[扫描] 遍历 {stats.dirs} 个目录，检查 {stats.files} 个文件，"
+        f"跳过做种目录 {stats.pruned_seeded} 个、排除目录 {stats.pruned_excluded} 个"
+        + (f"，无法访问 {stats.errors} 项" if stats.errors else "")
+    )
+
+def scan_large_files(save_paths: Set[str], content_paths: Set[str], min_size_mb: int, excluded_paths: Set[str], cache: Optional[ScanCache] = None, scheduler: Optional[ScanScheduler] = None) -> List[str]:
+    """高性能扫描未做种文件，返回路径列表"""
+    return [
+        record.path for record in iter_large_files(save_paths, content_paths, min_size_mb, excluded_paths, cache, scheduler)
+    ]
+
+class ServiceInventory(NamedTuple):
+    """单个下载器的种子路径数据"""
+    save_paths: Set[str]
+    content_paths: Set[str]
+    error: Optional[str]
+    # 数据来自快照而非本轮实时获取（inventory_snapshot），据此判断的未做种文件只报告不删除
+    stale: bool = False
+    # 精确模式：复核未做种候选文件，返回 True 表示按最新文件列表仍属于做种内容（torrent_files.RenameGuard）
+    recheck: Optional[Callable[[str], bool]] = None
+
+# qBittorrent 增量同步状态，按服务名称跨轮次保留
+_qb_sync_inventories: Dict[str, Tuple[PathMapper, QBittorrentSyncInventory]] = {}
+_qb_sync_lock = threading.Lock()
+
+def _get_qb_sync_inventory(services: Dict, client, mapper: PathMapper) -> QBittorrentSyncInventory:
+    """获取（必要时创建）该服务的增量同步状态，客户端或路径映射变化时重建"""
+    name = services.get('name', 'Unknown')
+    with _qb_sync_lock:
+        entry = _qb_sync_inventories.get(name)
+        if entry and entry[0].key == mapper.key and entry[1].client is client:
+            return entry[1]
+
+        sync_inventory = QBittorrentSyncInventory(
+            client, lambda save_path, t_name: resolve_torrent_paths(save_path, t_name, mapper)
+        )
+        _qb_sync_inventories[name] = (mapper, sync_inventory)
+        return sync_inventory
+
+def prune_services(active_names: Iterable[str]) -> None:
+    """释放已从配置中移除的服务的客户端与增量同步状态"""
+    active = set(active_names)
+    client_pool.prune(active)
+    with _qb_sync_lock:
+        for name in [n for n in _qb_sync_inventories if n not in active]:
+            del _qb_sync_inventories[name]
+
+def _precise_content_paths(services: Dict, client, client_type: str, torrents: List[TorrentRef], mapper: PathMapper) -> Tuple[Set[str], Optional[Callable[[str], bool]]]:
+    """精确模式：按种子文件列表计算做种文件的完整路径，同时返回复核候选文件的函数（没有使用缓存列表的种子时为 None）"""
+    if client_type == "qbittorrent":
+        fetch = lambda refs: torrent_files.fetch_qbittorrent_files(client, refs)
+    else:
+        fetch = lambda refs: torrent_files.fetch_transmission_files(client, refs)
+
+    resolve_file = lambda save_path, relative: resolve_torrent_paths(save_path, relative, mapper)[1]
+    content_paths, fallback, cached = torrent_files.resolve_content_paths(
+        torrents,
+        fetch,
+        resolve_file,
+        max_fetch=int(services.get('precise_max_fetch', torrent_files.DEFAULT_MAX_FETCH)),
+        refresh_days=float(services.get('precise_refresh_days', torrent_files.DEFAULT_REFRESH_DAYS)),
+    )
+    logger.info(
+        f"[精确模式] {services.get('name', 'Unknown')}: {len(torrents)} 个种子，"
+        f"{len(content_paths)} 个内容路径，{fallback} 个种子暂按名称匹配"
+    )
+    guard = torrent_files.RenameGuard(cached, fetch, resolve_file)
+    return content_paths, (guard.seeded if guard else None)
+
+def fetch_inventory(services: Dict, mapper: Optional[PathMapper] = None) -> ServiceInventory:
+    """
+    连接下载器并获取种子路径数据，失败时 error 为错误描述
+
+    mapper 为运行计划中编译好的路径映射表，未提供时按 services 现场编译
+    """
+    with metrics.timed("fetch", service=services.get('name', 'Unknown')):
+        return _fetch_inventory(services, mapper or get_path_mapper(services))
+
+def _fetch_inventory(services: Dict, mapper: PathMapper) -> ServiceInventory:
+    name = services.get('name', 'Unknown')
+    client_type = services.get("type", "").lower()
+    precise = services.get('precise_mode', False)
+
+    # 客户端跨轮次复用，不再每轮重新登录
+    client = client_pool.get_client(services)
     if not client:
-        return [], [f"无法连接到客户端: {services['name']}"]
+        return ServiceInventory(set(), set(), f"无法连接到客户端: {name}")
+
+    err = None
+    recheck = None
+    try:
+        if client_type == "qbittorrent":
+            # qBittorrent 使用 sync/maindata 增量同步
+            sync_inventory = _get_qb_sync_inventory(services, client, mapper)
+            save_paths, content_paths = sync_inventory.refresh()
+            if precise:
+                torrents = [TorrentRef(h, save, t_name, h) for h, save, t_name in sync_inventory.torrents()]
+                content_paths, recheck = _precise_content_paths(services, client, client_type, torrents, mapper)
+        elif precise:
+            torrents = [
+                TorrentRef(t.hashString, t.download_dir, t.name, t.id) for t in iter_transmission_torrents(client)
+            ]
+            save_paths = {mapper.translate(t.save_path) for t in torrents}
+            content_paths, recheck = _precise_content_paths(services, client, client_type, torrents, mapper)
+        else:
+            save_paths, content_paths, err = get_torrents_data(client, client_type, mapper)
+    except Exception as e:
+        err = str(e)
+
+    if err:
+        # 丢弃客户端与同步状态，下一轮重新连接并全量同步
+        client_pool.invalidate(name)
+        return ServiceInventory(set(), set(), f"{name} 获取种子数据失败: {err}")
+
+    return ServiceInventory(save_paths, content_paths, None, recheck=recheck)
+
+def stream_unseeded_files(services: Dict, check_file_size: int, excluded_paths: Union[ExclusionMatcher, Set[str]], cache: Optional[ScanCache] = None, inventory: Optional[ServiceInventory] = None, scheduler: Optional[ScanScheduler] = None) -> Tuple[Iterator[FileRecord], List[str]]:
+    """
+    主入口函数（流式），返回 (未做种文件生成器, 错误消息列表)
 
+    inventory 为已并发获取好的种子数据（可选）；物理扫描在迭代生成器时才进行，
+    scheduler 为并行扫描调度器（可选，默认顺序扫描）
+    """
+    logger.info(f"[扫描开始] 服务: {services['name']} ({services['type']})")
+    
     # 1. 获取种子路径数据
-    save_paths, content_paths, err = get_torrents_data(
-        client, services["type"], services.get("path_mapping", [])
-    )
+    if inventory is None:
+        inventory = fetch_inventory(services)
     
-    if err:
-        return [], [f"获取种子数据失败: {err}"]
+    if inventory.error:
+        return iter(()), [inventory.error]
 
+    save_paths, content_paths = inventory.save_paths, inventory.content_paths
     if not save_paths:
         logger.info("[扫描] 客户端内无种子或未匹配到路径")
-        return [], []
+        return iter(()), []
 
     # 2. 执行物理扫描
-    unseeded_list = scan_large_files(
+    records = iter_large_files(
         save_paths=save_paths,
         content_paths=content_paths,
         min_size_mb=check_file_size,
-        excluded_paths=excluded_paths
+        excluded_paths=excluded_paths,
+        cache=cache,
+        scheduler=scheduler,
+        service_name=services['name']
     )
-    
-    return unseeded_list, error_messages
\ No newline at end of file
+    if inventory.recheck is not None:
+        # 精确模式：缓存的文件列表可能已过时，候选文件按最新文件列表复核
+        records = (record for record in records if not inventory.recheck(record.path))
+    return records, []
+
+def find_unseeded_files(services: Dict, check_file_size: int, excluded_paths: Union[ExclusionMatcher, Set[str]], cache: Optional[ScanCache] = None, inventory: Optional[ServiceInventory] = None, scheduler: Optional[ScanScheduler] = None) -> Tuple[List[str], List[str]]:
+    """主入口函数，返回 (未做种文件列表, 错误消息列表)"""
+    records, error_messages = stream_unseeded_files(services, check_file_size, excluded_paths, cache, inventory, scheduler)
+    return [record.path for record in records], error_messages
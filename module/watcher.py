@@ -0,0 +1,352 @@
+"""
+实时监控模式（仅 Linux）
+
+基于 inotify 监控扫描目录（全局模式的 scan_paths，普通模式下各下载器的保存路径），
+只对发生变化的文件重新判断是否做种，不再依赖周期性的完整目录遍历发现孤立文件。
+周期性的完整扫描仍然保留（间隔可以调得很长），用于兜底 inotify 无法覆盖的情况
+（事件队列溢出、种子被删除后遗留的文件等）。
+
+判断规则与全局模式一致：变化的文件只要属于任意一个下载器的做种内容即视为做种中。
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import stat
+import struct
+import sys
+import threading
+import time
+from itertools import chain
+from typing import Callable, Dict, List, Optional, Set
+
+from tools import logs
+from module import cleanup, inventory, notification
+from module.scanner import FileRecord
+from module.exclusion import ExclusionMatcher
+from module.runtime_plan import RuntimePlan
+from module.seeded_index import CompactPathIndex
+from module.unseeded import normalize_path
+
+logger = logs.logs_configuration()
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+_WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+DEFAULT_SETTLE_SECONDS = 60
+
+
+class Inotify:
+    """inotify 的最小 ctypes 封装"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        self._rm_watch(self.fd, wd)
+
+    def read_events(self, timeout: float):
+        """等待最多 timeout 秒，返回 [(wd, mask, name), ...]"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(buf):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(buf, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(buf[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class DirectoryWatcher:
+    """
+    监控线程：维护已监控目录表与待判断的变化文件，
+    文件在 settle_seconds 内没有新的事件且 mtime 也早于 settle_seconds 之前后，刷新种子数据并逐个判断
+    （打开一次后持续写入的文件只有 IN_CREATE，写入过程中不再产生事件，需要以 mtime 确认写入已结束）
+    """
+
+    def __init__(self, load_plan: Callable[[], RuntimePlan], stop_event: threading.Event):
+        # 与周期扫描共用当前运行计划（路径映射、排除规则等），配置变化后同步生效
+        self.load_plan = load_plan
+        self.stop_event = stop_event
+        # 事件队列溢出时置位，由主循环立即执行一次完整扫描
+        self.reconcile_event = threading.Event()
+
+        self._inotify = Inotify()
+        self._wd_to_dir: Dict[int, str] = {}
+        self._dir_to_wd: Dict[str, int] = {}
+        self._pending: Dict[str, float] = {}
+        self._settle = float(DEFAULT_SETTLE_SECONDS)
+        self._roots: Set[str] = set()
+        self._excluded_index = ExclusionMatcher()
+        # 最近一次刷新中使用快照数据的下载器，非空时本批次只报告不删除
+        self._stale_services: List[str] = []
+        # 精确模式下复核候选文件的函数（ServiceInventory.recheck）
+        self._rechecks: List[Callable[[str], bool]] = []
+        self._thread = threading.Thread(target=self._run, name="watcher", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        self._thread.join(timeout)
+
+    def _watch_tree(self, root: str, mark_files: bool) -> None:
+        """递归监控目录；mark_files 为 True 时把其中已有的文件加入待判断列表（新移入的目录）"""
+        stack = [root]
+        now = time.monotonic()
+        while stack:
+            current = stack.pop()
+            if current in self._dir_to_wd or self._excluded_index.contains(current):
+                continue
+            try:
+                wd = self._inotify.add_watch(current, _WATCH_MASK)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    logger.error(
+                        "[实时监控] inotify 监控数量已达上限，请调大 fs.inotify.max_user_watches；"
+                        "未监控的目录仍由周期性完整扫描覆盖"
+                    )
+                    return
+                logger.debug(f"[实时监控] 无法监控目录: {current} - {e}")
+                continue
+            # 同一目录（inode）被移动后重新监控时内核返回相同的 wd，先清理旧路径
+            self._forget_dir(wd)
+            self._wd_to_dir[wd] = current
+            self._dir_to_wd[current] = wd
+
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif mark_files:
+                            self._pending[entry.path] = now
+            except OSError as e:
+                logger.debug(f"[实时监控] 无法读取目录: {current} - {e}")
+
+    def _forget_dir(self, wd: int) -> None:
+        path = self._wd_to_dir.pop(wd, None)
+        if path is not None:
+            self._dir_to_wd.pop(path, None)
+
+    def _handle_event(self, wd: int, mask: int, name: str) -> None:
+        if mask & IN_Q_OVERFLOW:
+            logger.warning("[实时监控] inotify 事件队列溢出，安排一次完整扫描")
+            self.reconcile_event.set()
+            return
+        if mask & IN_IGNORED:
+            self._forget_dir(wd)
+            return
+        if mask & IN_MOVE_SELF:
+            # 目录被移走，新位置由其父目录的 IN_MOVED_TO 事件重新监控
+            self._inotify.rm_watch(wd)
+            self._forget_dir(wd)
+            return
+
+        parent = self._wd_to_dir.get(wd)
+        if parent is None or not name:
+            return
+        path = parent + os.sep + name if not parent.endswith(os.sep) else parent + name
+
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self._watch_tree(path, mark_files=True)
+            return
+
+        if mask & (IN_DELETE | IN_MOVED_FROM):
+            self._pending.pop(path, None)
+        elif mask & (IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO):
+            self._pending[path] = time.monotonic()
+
+    def _refresh(self, plan: RuntimePlan) -> Optional[CompactPathIndex]:
+        """刷新所有下载器的种子数据与监控根目录；有下载器失败时返回 None，本批次推迟判断"""
+        self._excluded_index = plan.exclusions
+
+        # 与全局扫描相同，所有下载器的内容路径合并为一个紧凑索引
+        content_paths = []
+        roots = set()
+        failed = []
+        stale = []
+        rechecks = []
+        for service, result in inventory.iter_inventories(
+            list(plan.services), path_mappers=plan.path_mappers, **plan.fetch_options
+        ):
+            if result.error:
+                failed.append(result.error)
+                continue
+            if result.stale:
+                stale.append(service.get('name', 'Unknown'))
+            if result.recheck is not None:
+                rechecks.append(result.recheck)
+            content_paths.append(result.content_paths)
+            roots.update(normalize_path(p) for p in result.save_paths)
+        seeded_index = CompactPathIndex(chain.from_iterable(content_paths), normalize_path)
+        self._stale_services = stale
+        self._rechecks = rechecks
+
+        if plan.global_mode:
+            roots = {normalize_path(p) for p in plan.scan_paths}
+
+        for root in roots - self._roots:
+            if os.path.isdir(root):
+                logger.info(f"[实时监控] 开始监控: {root}")
+                self._watch_tree(root, mark_files=False)
+        self._roots = roots
+
+        if failed:
+            # 下载器不可用时它的文件会被误判为未做种，宁可推迟
+            logger.warning(f"[实时监控] 部分下载器获取失败，推迟判断: {failed}")
+            return None
+        return seeded_index
+
+    def _unsettled(self, paths: List[str]) -> List[str]:
+        """mtime 在 settle_seconds 之内（仍在写入）的文件重新排队，返回可以判断的文件"""
+        cutoff = time.time() - self._settle
+        now = time.monotonic()
+        ready = []
+        for path in paths:
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            if mtime > cutoff:
+                self._pending[path] = now
+            else:
+                ready.append(path)
+        return ready
+
+    def _process(self, paths: List[str]) -> None:
+        paths = self._unsettled(paths)
+        if not paths:
+            return
+        plan = self.load_plan()
+        config = plan.config
+        seeded_index = self._refresh(plan)
+        if seeded_index is None:
+            now = time.monotonic()
+            for path in paths:
+                self._pending.setdefault(path, now)
+            return
+
+        min_size_bytes = plan.min_size * 1024 * 1024
+        hardlink_aware = config.get('hardlink_aware', False)
+        records = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if not stat.S_ISREG(st.st_mode) or st.st_size < min_size_bytes:
+                continue
+            if self._excluded_index.contains(path) or seeded_index.contains(path):
+                continue
+            if any(recheck(path) for recheck in self._rechecks):
+                continue
+            if hardlink_aware and st.st_nlink > 1:
+                # 多链接文件可能是做种文件的硬链接，需要完整扫描收集 inode 后才能判断
+                continue
+            records.append(FileRecord(path, st.st_size, st.st_mtime, st.st_ino, st.st_dev, st.st_nlink))
+
+        logger.info(f"[实时监控] 检查了 {len(paths)} 个变化文件，发现 {len(records)} 个未做种文件")
+        if not records:
+            return
+
+        auto_remove = plan.auto_remove
+        if self._stale_services and auto_remove:
+            logger.warning(f"[实时监控] {', '.join(self._stale_services)} 使用快照数据，本批次不执行自动删除，仅报告")
+            auto_remove = False
+            config = {**config, 'enable_auto_remove': False}
+        summary = cleanup.run_cleanup(
+            records, auto_remove, self.stop_event, notification.REPORT_FILE_LIMIT,
+            protected_roots=self._roots,
+            workers=plan.delete_workers
+        )
+        if summary.file_count:
+            notification.send_notification(
+                {"name": "WatchMode", "type": "watch"}, config, True, deleted_info=summary.to_report()
+            )
+
+    def _run(self) -> None:
+        try:
+            plan = self.load_plan()
+            settle = self._settle = float(
+                (plan.config.get('watch_mode') or {}).get('settle_seconds', DEFAULT_SETTLE_SECONDS)
+            )
+            self._refresh(plan)
+            logger.info(f"[实时监控] 已监控 {len(self._dir_to_wd)} 个目录，文件稳定 {settle:.0f} 秒后判断")
+
+            while not self.stop_event.is_set():
+                for wd, mask, name in self._inotify.read_events(timeout=1.0):
+                    self._handle_event(wd, mask, name)
+
+                now = time.monotonic()
+                settled = [p for p, t in self._pending.items() if now - t >= settle]
+                if settled:
+                    for path in settled:
+                        del self._pending[path]
+                    self._process(settled)
+        except Exception as e:
+            logger.error(f"[实时监控] 监控线程异常退出，继续使用周期性扫描: {e}")
+            self.reconcile_event.set()
+        finally:
+            self._inotify.close()
+
+
+def start_watcher(load_plan: Callable[[], RuntimePlan], stop_event: threading.Event) -> Optional[DirectoryWatcher]:
+    """启动实时监控，load_plan 返回当前运行计划；不支持的平台返回 None"""
+    if not sys.platform.startswith("linux"):
+        logger.error("[实时监控] 仅支持 Linux，继续使用周期性扫描")
+        return None
+    try:
+        watcher = DirectoryWatcher(load_plan, stop_event)
+    except (OSError, AttributeError) as e:
+        logger.error(f"[实时监控] 无法初始化 inotify，继续使用周期性扫描: {e}")
+        return None
+    watcher.start()
+    return watcher
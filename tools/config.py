@@ -1,31 +1,46 @@
 import os
 import sys
+import hashlib
+import threading
 import yaml
+from typing import Optional
 from tools import logs
 
 # 初始化日志记录器
 logger = logs.logs_configuration()
 
-def yaml_configuration():
+# 运行中检查配置文件是否变化的间隔（秒）
+RELOAD_CHECK_SECONDS = 10
+
+
+def _config_path() -> str:
     # 默认配置文件路径：config/config.yaml
     # 可通过环境变量 CONFIG_PATH 覆盖
-    config_file = os.getenv("CONFIG_PATH", "./config/config.yaml")
-    
+    return os.getenv("CONFIG_PATH", "./config/config.yaml")
+
+
+def _parse(data, config_file: str):
+    # safe_load 返回解析后的字典或列表
+    config = yaml.safe_load(data)
+
+    # 健壮性检查：如果文件是空的，safe_load 会返回 None
+    if config is None:
+        logger.error(f"[读取配置]错误: 配置文件 {config_file} 是空的！")
+        return []
+    return config
+
+
+def yaml_configuration(config_file: Optional[str] = None):
+    config_file = config_file or _config_path()
+
     try:
         with open(config_file, 'r', encoding='utf-8') as f:
-            # safe_load 返回解析后的字典或列表
-            config = yaml.safe_load(f)
-            
-            # 健壮性检查：如果文件是空的，safe_load 会返回 None
-            if config is None:
-                logger.error(f"[读取配置]错误: 配置文件 {config_file} 是空的！")
-                return []
-            return config
+            return _parse(f, config_file)
 
     except FileNotFoundError:
         logger.error(f"[读取配置]错误: 找不到配置文件 '{config_file}'。请检查 Docker 挂载是否正确。")
         # 根据你的逻辑，是选择退出程序还是返回空列表
-        sys.exit(1) 
+        sys.exit(1)
 
     except yaml.YAMLError as e:
         logger.error(f"[读取配置]错误: 配置文件格式非法 (YAML 解析失败): \n{e}")
@@ -33,4 +48,91 @@ def yaml_configuration():
 
     except Exception as e:
         logger.error(f"[读取配置]发生未知错误: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+
+
+class ConfigManager:
+    """
+    按需重新加载配置文件
+
+    - 文件 mtime 与大小都未变化时直接返回上一次的解析结果，不读文件
+    - 变化时读取内容并比对哈希，内容相同（例如只是 touch）不重新解析
+    - 首次加载失败与 yaml_configuration 一样直接退出；运行中改坏配置文件时保留上一次的配置
+      （包括编辑器保存过程中短暂出现的空文件等解析结果不是字典的情况）
+    - version 在配置内容每次变化后加一，供调用方判断是否需要重新编译派生结构
+    """
+
+    def __init__(self, config_file: Optional[str] = None):
+        self.config_file = config_file or _config_path()
+        self.version = 0
+        self._lock = threading.Lock()
+        self._signature = None
+        self._digest = None
+        self._config = None
+
+    def load(self):
+        """返回当前配置（多线程安全）"""
+        with self._lock:
+            if self._config is None:
+                return self._initial_load()
+
+            try:
+                st = os.stat(self.config_file)
+            except OSError as e:
+                logger.error(f"[读取配置] 无法访问配置文件，继续使用上一次的配置: {e}")
+                return self._config
+
+            signature = (st.st_mtime_ns, st.st_size)
+            if signature == self._signature:
+                return self._config
+
+            try:
+                with open(self.config_file, 'rb') as f:
+                    data = f.read()
+            except OSError as e:
+                logger.error(f"[读取配置] 无法读取配置文件，继续使用上一次的配置: {e}")
+                return self._config
+            self._signature = signature
+
+            digest = hashlib.sha256(data).hexdigest()
+            if digest == self._digest:
+                return self._config
+
+            try:
+                config = _parse(data, self.config_file)
+            except yaml.YAMLError as e:
+                logger.error(f"[读取配置] 配置文件格式非法，继续使用上一次的配置: \n{e}")
+                return self._config
+            if not isinstance(config, dict):
+                logger.error("[读取配置] 配置文件顶层不是键值映射，继续使用上一次的配置")
+                return self._config
+
+            self._digest = digest
+            self._config = config
+            self.version += 1
+            logger.info(f"[读取配置] 检测到配置文件变化，已重新加载 (第 {self.version} 版)")
+            return config
+
+    def _initial_load(self):
+        try:
+            st = os.stat(self.config_file)
+            with open(self.config_file, 'rb') as f:
+                data = f.read()
+        except OSError:
+            # 交由 yaml_configuration 输出错误并退出
+            return yaml_configuration(self.config_file)
+
+        try:
+            config = _parse(data, self.config_file)
+        except yaml.YAMLError as e:
+            logger.error(f"[读取配置]错误: 配置文件格式非法 (YAML 解析失败): \n{e}")
+            sys.exit(1)
+        if not isinstance(config, dict):
+            logger.error(f"[读取配置]错误: 配置文件 {self.config_file} 顶层不是键值映射")
+            sys.exit(1)
+
+        self._signature = (st.st_mtime_ns, st.st_size)
+        self._digest = hashlib.sha256(data).hexdigest()
+        self._config = config
+        self.version = 1
+        return config
@@ -1,38 +1,142 @@
 import os
+import time
+import queue
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# 各处理器的日志级别，可通过环境变量分别设置（DEBUG/INFO/WARNING/ERROR）
+# LOG_LEVEL 同时作用于两者，LOG_FILE_LEVEL / LOG_CONSOLE_LEVEL 优先
+LEVEL_ENV = 'LOG_LEVEL'
+FILE_LEVEL_ENV = 'LOG_FILE_LEVEL'
+CONSOLE_LEVEL_ENV = 'LOG_CONSOLE_LEVEL'
+
+DEFAULT_LOG_PATH = 'logs/Void.log'
+
+
+def log_path() -> str:
+    """日志文件路径，可通过环境变量 LOG_PATH 覆盖"""
+    return os.getenv('LOG_PATH', DEFAULT_LOG_PATH)
+
+
+def log_dir() -> str:
+    """日志所在目录；扫描缓存、快照、扫描结果等运行数据默认也放在这里"""
+    return os.path.dirname(log_path()) or "."
+
+
+def _level(env_name: str, default: int) -> int:
+    name = os.getenv(env_name) or os.getenv(LEVEL_ENV)
+    if not name:
+        return default
+    level = logging.getLevelName(name.strip().upper())
+    return level if isinstance(level, int) else default
+
 
 def logs_configuration(log_file=None, class_name='Void'):
     if log_file is None:
-        log_file = os.getenv('LOG_PATH', 'logs/Void.log')
-        
+        log_file = log_path()
+
     logger = logging.getLogger(class_name)
-    
+
     # 【关键修复】如果已经有处理器了，说明已经配置过，直接返回，不再重复添加
     if logger.handlers:
         return logger
 
-    logger.setLevel(logging.DEBUG)
-
     formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - [%(process)d:%(thread)d] - %(message)s')
 
     os.makedirs(os.path.dirname(log_file), exist_ok=True)
-    
+
     # 文件处理器
     file_handler = RotatingFileHandler(log_file, maxBytes=10*1024*1024, backupCount=5, encoding='utf-8')
     file_handler.setFormatter(formatter)
-    file_handler.setLevel(logging.DEBUG)
+    file_handler.setLevel(_level(FILE_LEVEL_ENV, logging.DEBUG))
 
     # 控制台处理器
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
-    console_handler.setLevel(logging.DEBUG)
+    console_handler.setLevel(_level(CONSOLE_LEVEL_ENV, logging.DEBUG))
 
-    # 添加处理器
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    handlers = (file_handler, console_handler)
+    # logger 级别取各处理器中最低的，低于它的日志在调用处直接丢弃
+    logger.setLevel(min(handler.level for handler in handlers))
+
+    # 扫描线程只把日志记录放入队列，格式化与写文件/控制台由后台监听线程完成
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # 退出时等待队列写完
+    atexit.register(listener.stop)
+
+    logger.addHandler(queue_handler)
+
+    # 进程模式扫描的子进程中没有监听线程，改为直接写入
+    def _after_fork_in_child():
+        if queue_handler in logger.handlers:
+            logger.removeHandler(queue_handler)
+            for handler in handlers:
+                logger.addHandler(handler)
+
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_after_fork_in_child)
 
     # 可选：防止日志向上传递给 root logger 导致再次重复
     logger.propagate = False
 
-    return logger
\ No newline at end of file
+    return logger
+
+
+class RateLimitedLog:
+    """
+    逐文件消息的限流：每个时间窗口最多输出 limit 条，其余只计数，
+    下一个窗口开始或调用 flush() 时输出一条汇总。
+
+    消息使用 % 格式参数，被丢弃或级别未启用时不做格式化：
+        access_errors = RateLimitedLog(logger, "[扫描] 无法访问的文件/目录")
+        access_errors.log("[扫描] 无法访问文件: %s - %s", path, e)
+    """
+
+    def __init__(self, logger: logging.Logger, summary: str, level: int = logging.DEBUG,
+                 limit: int = 20, window: float = 60.0):
+        self._logger = logger
+        self._summary = summary
+        self._level = level
+        self._limit = limit
+        self._window = window
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._emitted = 0
+        self._suppressed = 0
+
+    def _take_suppressed(self) -> int:
+        suppressed, self._suppressed = self._suppressed, 0
+        self._emitted = 0
+        self._window_start = time.monotonic()
+        return suppressed
+
+    def _log_summary(self, suppressed: int) -> None:
+        if suppressed:
+            self._logger.log(self._level, f"{self._summary}：另有 {suppressed} 条同类消息已省略")
+
+    def log(self, msg: str, *args) -> None:
+        if not self._logger.isEnabledFor(self._level):
+            return
+        with self._lock:
+            suppressed = 0
+            if time.monotonic() - self._window_start >= self._window:
+                suppressed = self._take_suppressed()
+            allowed = self._emitted < self._limit
+            if allowed:
+                self._emitted += 1
+            else:
+                self._suppressed += 1
+        self._log_summary(suppressed)
+        if allowed:
+            self._logger.log(self._level, msg, *args)
+
+    def flush(self) -> None:
+        """输出当前窗口内被省略的条数，并开始新的窗口"""
+        with self._lock:
+            suppressed = self._take_suppressed()
+        self._log_summary(suppressed)